@@ -94,6 +94,7 @@ class Settings(BaseSettings):
     )
     SUMMARIZATION_MAX_LENGTH: int = Field(default=150, env="SUMMARIZATION_MAX_LENGTH")
     SUMMARIZATION_MIN_LENGTH: int = Field(default=30, env="SUMMARIZATION_MIN_LENGTH")
+    SUMMARIZATION_WARMUP: bool = Field(default=False, env="SUMMARIZATION_WARMUP")  # Load + warm default model at startup
     
     # Supabase settings removed
     
@@ -105,7 +105,13 @@ async def initialize_services():
         
         # Initialize summarization services
         logger.info("📝 Initializing summarization services...")
-        from app.services.combined_summarization_service import combined_summarizer
+        from app.services.combined_summarization_service import get_combined_summarizer
+        combined_summarizer = get_combined_summarizer()
+        if settings.SUMMARIZATION_WARMUP:
+            logger.info("🔥 Warming up English summarization model...")
+            await combined_summarizer.english_summarizer.warmup(
+                precision=combined_summarizer.config['precision']
+            )
         services.append("summarization")
         
         # Initialize cloud services
@@ -3,20 +3,25 @@ Combined Summarization Service
 Orchestrates language detection and appropriate model selection for document summarization
 """
 
+import os
+import copy
+import hashlib
 import logging
-from typing import Dict, Optional, List, Any
+import functools
+from typing import Dict, Optional, List, Any, Tuple
 import asyncio
+from cachetools import TTLCache
 from .language_detection_service import get_language_detector
-from .english_summarization_service import get_english_summarizer
-from .malayalam_summarization_service import get_malayalam_summarizer
 
 logger = logging.getLogger(__name__)
 
 class CombinedSummarizationService:
     def __init__(self):
         self.language_detector = get_language_detector()
-        self.english_summarizer = get_english_summarizer()
-        self.malayalam_summarizer = get_malayalam_summarizer()
+        
+        # Summarizers are created on first use so workers only load the languages they serve
+        self._english_summarizer = None
+        self._malayalam_summarizer = None
         
         # Service configuration
         self.config = {
@@ -24,8 +29,36 @@ class CombinedSummarizationService:
             'malayalam_threshold': 0.5,    # If Malayalam prob > 0.5, use Malayalam models
             'bilingual_threshold': 0.25,   # If both > 0.25, treat as bilingual
             'confidence_threshold': 0.6,   # Minimum confidence for language detection
-            'fallback_language': 'english' # Default fallback
+            'fallback_language': 'english', # Default fallback
+            'precision': os.getenv('SUMMARIZER_PRECISION', 'auto'),  # 'auto', 'fp32', 'fp16', 'bf16' or 'int8'
+            'summary_cache_size': int(os.getenv('SUMMARY_CACHE_SIZE', '2048')),
+            'summary_cache_ttl': int(os.getenv('SUMMARY_CACHE_TTL', '3600')),  # seconds
+            # Multi-model selection returns at the first summary more confident than this. The per-model
+            # confidences are constants (English 0.85, Malayalam 0.80), so only English candidates stop early
+            'early_stop_confidence': 0.8
         }
+        
+        # Finished results keyed by content hash + generation parameters
+        self._summary_cache = TTLCache(
+            maxsize=self.config['summary_cache_size'],
+            ttl=self.config['summary_cache_ttl']
+        )
+
+    @property
+    def english_summarizer(self):
+        """English summarization service, imported and created on first access"""
+        if self._english_summarizer is None:
+            from .english_summarization_service import get_english_summarizer
+            self._english_summarizer = get_english_summarizer()
+        return self._english_summarizer
+
+    @property
+    def malayalam_summarizer(self):
+        """Malayalam summarization service, imported and created on first access"""
+        if self._malayalam_summarizer is None:
+            from .malayalam_summarization_service import get_malayalam_summarizer
+            self._malayalam_summarizer = get_malayalam_summarizer()
+        return self._malayalam_summarizer
 
     async def auto_summarize(
         self,
@@ -76,6 +109,24 @@ class CombinedSummarizationService:
                 primary_language, is_bilingual, probabilities, confidence
             )
             
+            # Re-forwarded documents hit the cache and skip the models entirely
+            cache_key = (
+                hashlib.blake2b(text.encode('utf-8')).hexdigest()[:16],
+                strategy['primary_model'],
+                max_length,
+                min_length,
+                role_context,
+                tuple(preferred_models or ()),
+                self.config['precision']
+            )
+            cached = self._summary_cache.get(cache_key)
+            if cached is not None:
+                result = copy.deepcopy(cached)
+                result['language_analysis'] = language_analysis if include_analysis else None
+                result['processing_time'] = 0
+                result['cache_hit'] = True
+                return result
+            
             # Step 3: Generate Summaries
             summaries = await self._generate_summaries(
                 text, strategy, max_length, min_length, role_context, preferred_models
@@ -96,6 +147,11 @@ class CombinedSummarizationService:
             if role_context:
                 result['role_specific'] = summaries.get('role_specific', {})
             
+            # Results built on a model's truncation fallback aren't cached, so the next request retries the model
+            if 'error' not in summaries and not summaries['degraded']:
+                self._summary_cache[cache_key] = copy.deepcopy(result)
+            result['cache_hit'] = False
+            
             return result
             
         except Exception as e:
@@ -178,7 +234,8 @@ class CombinedSummarizationService:
             'primary': {'en': '', 'ml': ''},
             'alternatives': {},
             'role_specific': {},
-            'processing_time': 0
+            'processing_time': 0,
+            'degraded': False  # True when any model fell back to truncation
         }
         
         # Override models if preferred ones are specified
@@ -188,16 +245,18 @@ class CombinedSummarizationService:
         try:
             # Generate primary summary
             if strategy['approach'] == 'single':
-                primary_summary = await self._generate_single_summary(
+                primary_summary, degraded = await self._generate_single_summary(
                     text, strategy, max_length, min_length, role_context
                 )
                 summaries['primary'] = primary_summary
+                summaries['degraded'] |= degraded
             
             elif strategy['approach'] == 'bilingual':
-                bilingual_summaries = await self._generate_bilingual_summaries(
+                bilingual_summaries, degraded = await self._generate_bilingual_summaries(
                     text, strategy, max_length, min_length, role_context
                 )
                 summaries['primary'] = bilingual_summaries
+                summaries['degraded'] |= degraded
                 
             elif strategy['approach'] == 'multi-model':
                 multi_summaries = await self._generate_multi_model_summaries(
@@ -205,13 +264,15 @@ class CombinedSummarizationService:
                 )
                 summaries['primary'] = multi_summaries['best']
                 summaries['alternatives'] = multi_summaries['alternatives']
+                summaries['degraded'] |= multi_summaries['degraded']
             
             # Generate role-specific summaries if requested
             if role_context:
-                role_summaries = await self._generate_role_specific_summaries(
+                role_summaries, degraded = await self._generate_role_specific_summaries(
                     text, strategy, role_context, max_length, min_length
                 )
                 summaries['role_specific'] = role_summaries
+                summaries['degraded'] |= degraded
             
             summaries['processing_time'] = time.time() - start_time
             
@@ -228,23 +289,25 @@ class CombinedSummarizationService:
         max_length: int = None, 
         min_length: int = None,
         role_context: str = None
-    ) -> Dict[str, str]:
-        """Generate summary using single best model"""
+    ) -> Tuple[Dict[str, str], bool]:
+        """Generate summary using single best model, returns (summary, degraded)"""
         
         model = strategy['primary_model']
         target_lang = strategy['target_languages'][0]
         
         if target_lang == 'english':
             result = await self.english_summarizer.summarize_with_model(
-                text, model, max_length, min_length, role_context
+                text, model, max_length, min_length, role_context,
+                precision=self.config['precision']
             )
-            return {'en': result['summary'], 'ml': ''}
+            return {'en': result['summary'], 'ml': ''}, self._is_degraded(result)
         
         else:  # Malayalam
             result = await self.malayalam_summarizer.summarize_with_model(
-                text, model, max_length, min_length, target_lang, role_context
+                text, model, max_length, min_length, target_lang, role_context,
+                precision=self.config['precision']
             )
-            return {'en': '', 'ml': result['summary']}
+            return {'en': '', 'ml': result['summary']}, self._is_degraded(result)
 
     async def _generate_bilingual_summaries(
         self, 
@@ -253,23 +316,25 @@ class CombinedSummarizationService:
         max_length: int = None, 
         min_length: int = None,
         role_context: str = None
-    ) -> Dict[str, str]:
-        """Generate summaries in both languages for bilingual content"""
+    ) -> Tuple[Dict[str, str], bool]:
+        """Generate summaries in both languages for bilingual content, returns (summaries, degraded)"""
         
         # Use multilingual model for primary summary
         malayalam_result = await self.malayalam_summarizer.summarize_with_model(
-            text, strategy['primary_model'], max_length, min_length, 'malayalam', role_context
+            text, strategy['primary_model'], max_length, min_length, 'malayalam', role_context,
+            precision=self.config['precision']
         )
         
         # Generate English summary as well
         english_result = await self.english_summarizer.summarize_with_model(
-            text, 'bart-large-cnn', max_length, min_length, role_context
+            text, 'bart-large-cnn', max_length, min_length, role_context,
+            precision=self.config['precision']
         )
         
         return {
             'en': english_result['summary'],
             'ml': malayalam_result['summary']
-        }
+        }, self._is_degraded(english_result) or self._is_degraded(malayalam_result)
 
     async def _generate_multi_model_summaries(
         self, 
@@ -284,46 +349,78 @@ class CombinedSummarizationService:
         models_to_try = [strategy['primary_model']] + strategy['secondary_models'][:2]
         summaries = {}
         
-        # Try English models
-        for model in models_to_try:
-            try:
-                if model in ['bart-large-cnn', 'pegasus-cnn', 'bart-base']:
-                    result = await self.english_summarizer.summarize_with_model(
-                        text, model, max_length, min_length, role_context
-                    )
-                    summaries[f'english_{model}'] = {
-                        'summary': {'en': result['summary'], 'ml': ''},
-                        'confidence': result.get('confidence', 0.5),
-                        'model': model
-                    }
-            except Exception as e:
-                logger.warning(f"Model {model} failed: {e}")
-        
-        # Try Malayalam models  
-        for model in models_to_try:
-            try:
-                if model in ['indicbart', 'mt5-small', 'mt5-base', 'mbart-large']:
-                    result = await self.malayalam_summarizer.summarize_with_model(
-                        text, model, max_length, min_length, 'malayalam', role_context
-                    )
-                    summaries[f'malayalam_{model}'] = {
-                        'summary': {'en': '', 'ml': result['summary']},
-                        'confidence': result.get('confidence', 0.5),
-                        'model': model
-                    }
-            except Exception as e:
-                logger.warning(f"Malayalam model {model} failed: {e}")
+        # Run candidates concurrently and stop at the first "good enough" summary
+        tasks = [
+            asyncio.ensure_future(self._summarize_candidate(
+                text, model, max_length, min_length, role_context
+            ))
+            for model in models_to_try
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                candidate = await next_done
+                if candidate is None:
+                    continue
+                key, entry = candidate
+                summaries[key] = entry
+                if entry['confidence'] > self.config['early_stop_confidence']:
+                    break
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
         
         # Select best summary based on confidence and length
         if summaries:
             best_key = max(summaries.keys(), key=lambda k: summaries[k]['confidence'])
             best_summary = summaries[best_key]['summary']
             alternatives = {k: v['summary'] for k, v in summaries.items() if k != best_key}
+            degraded = summaries[best_key]['degraded']
         else:
             best_summary = {'en': '', 'ml': ''}
             alternatives = {}
+            degraded = True
         
-        return {'best': best_summary, 'alternatives': alternatives}
+        return {'best': best_summary, 'alternatives': alternatives, 'degraded': degraded}
+
+    async def _summarize_candidate(
+        self, 
+        text: str, 
+        model: str, 
+        max_length: int = None, 
+        min_length: int = None,
+        role_context: str = None
+    ) -> Optional[tuple]:
+        """Summarize with one candidate model, returning (key, entry) or None on failure"""
+        
+        try:
+            if model in ['bart-large-cnn', 'pegasus-cnn', 'bart-base']:
+                result = await self.english_summarizer.summarize_with_model(
+                    text, model, max_length, min_length, role_context,
+                    precision=self.config['precision']
+                )
+                return f'english_{model}', {
+                    'summary': {'en': result['summary'], 'ml': ''},
+                    'confidence': result.get('confidence', 0.5),
+                    'model': model,
+                    'degraded': self._is_degraded(result)
+                }
+            
+            if model in ['indicbart', 'mt5-small', 'mt5-base', 'mbart-large']:
+                result = await self.malayalam_summarizer.summarize_with_model(
+                    text, model, max_length, min_length, 'malayalam', role_context,
+                    precision=self.config['precision']
+                )
+                return f'malayalam_{model}', {
+                    'summary': {'en': '', 'ml': result['summary']},
+                    'confidence': result.get('confidence', 0.5),
+                    'model': model,
+                    'degraded': self._is_degraded(result)
+                }
+        except Exception as e:
+            logger.warning(f"Model {model} failed: {e}")
+        
+        return None
 
     async def _generate_role_specific_summaries(
         self, 
@@ -332,33 +429,44 @@ class CombinedSummarizationService:
         role_context: str,
         max_length: int = None, 
         min_length: int = None
-    ) -> Dict[str, Dict[str, str]]:
-        """Generate summaries tailored for different roles"""
+    ) -> Tuple[Dict[str, Dict[str, str]], bool]:
+        """Generate summaries tailored for different roles, returns (summaries by role, degraded)"""
         
         roles = ['staff', 'manager', 'director']
         if role_context and role_context.lower() not in roles:
             roles.append(role_context.lower())
         
         role_summaries = {}
+        degraded = False
         primary_lang = strategy['target_languages'][0] if strategy['target_languages'] else 'english'
         
         for role in roles:
             try:
                 if primary_lang == 'english':
                     result = await self.english_summarizer.summarize_with_model(
-                        text, strategy['primary_model'], max_length, min_length, role
+                        text, strategy['primary_model'], max_length, min_length, role,
+                        precision=self.config['precision']
                     )
                     role_summaries[role] = {'en': result['summary'], 'ml': ''}
+                    degraded |= self._is_degraded(result)
                 else:
                     result = await self.malayalam_summarizer.summarize_with_model(
-                        text, strategy['primary_model'], max_length, min_length, primary_lang, role
+                        text, strategy['primary_model'], max_length, min_length, primary_lang, role,
+                        precision=self.config['precision']
                     )
                     role_summaries[role] = {'en': '', 'ml': result['summary']}
+                    degraded |= self._is_degraded(result)
                     
             except Exception as e:
                 logger.warning(f"Role-specific summary failed for {role}: {e}")
+                degraded = True
         
-        return role_summaries
+        return role_summaries, degraded
+
+    @staticmethod
+    def _is_degraded(result: Dict[str, Any]) -> bool:
+        """True when a summarizer caught a generation failure and returned its truncation fallback"""
+        return 'error' in result or result.get('model_used') == 'fallback'
 
     async def _fallback_summarization(self, text: str, error: str) -> Dict[str, Any]:
         """Fallback summarization using simple truncation"""
@@ -391,7 +499,9 @@ class CombinedSummarizationService:
         for model in models:
             try:
                 if model in ['bart-large-cnn', 'pegasus-cnn', 'bart-base']:
-                    result = await self.english_summarizer.summarize_with_model(text, model)
+                    result = await self.english_summarizer.summarize_with_model(
+                        text, model, precision=self.config['precision']
+                    )
                     comparisons[model] = {
                         'summary': result['summary'],
                         'confidence': result.get('confidence', 0.5),
@@ -399,7 +509,9 @@ class CombinedSummarizationService:
                         'method': result.get('method', 'unknown')
                     }
                 elif model in ['indicbart', 'mt5-small', 'mt5-base', 'mbart-large']:
-                    result = await self.malayalam_summarizer.summarize_with_model(text, model)
+                    result = await self.malayalam_summarizer.summarize_with_model(
+                        text, model, precision=self.config['precision']
+                    )
                     comparisons[model] = {
                         'summary': result['summary'],
                         'confidence': result.get('confidence', 0.5),
@@ -463,17 +575,15 @@ class CombinedSummarizationService:
         
         return health_status
 
-# Global service instance
-combined_summarizer = CombinedSummarizationService()
-
 async def auto_summarize_document(
     text: str,
     role_context: str = None,
     **kwargs
 ) -> Dict[str, Any]:
     """Convenience function for automatic document summarization"""
-    return await combined_summarizer.auto_summarize(text, role_context=role_context, **kwargs)
+    return await get_combined_summarizer().auto_summarize(text, role_context=role_context, **kwargs)
 
+@functools.lru_cache(maxsize=1)
 def get_combined_summarizer() -> CombinedSummarizationService:
-    """Get the combined summarization service instance"""
-    return combined_summarizer
+    """Get the combined summarization service instance (created on first call)"""
+    return CombinedSummarizationService()
@@ -9,6 +9,8 @@ import imaplib
 import smtplib
 import re
 import json
+import base64
+import quopri
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Any
 from email.mime.multipart import MIMEMultipart
@@ -19,6 +21,115 @@ from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+DOCUMENT_KEYWORDS = [
+    'invoice', 'receipt', 'statement', 'report', 'contract',
+    'agreement', 'document', 'attachment', 'pdf', 'file'
+]
+_DOC_KW_RE = re.compile('|'.join(DOCUMENT_KEYWORDS), re.IGNORECASE)
+
+# Tokens of an IMAP parenthesized list: parens, quoted strings, atoms/numbers/NIL
+_IMAP_TOKEN_RE = re.compile(rb'\(|\)|"(?:[^"\\]|\\.)*"|[^\s()"]+')
+_FETCH_SECTION_RE = re.compile(rb'BODY\[([0-9.]*|HEADER)\]', re.IGNORECASE)
+_FETCH_SIZE_RE = re.compile(rb'RFC822\.SIZE (\d+)', re.IGNORECASE)
+
+
+def _parse_bodystructure(meta: bytes) -> Optional[list]:
+    """Parse the BODYSTRUCTURE list out of a FETCH response into nested lists.
+
+    Returns None when the structure is missing or uses literals, so the caller
+    can fall back to downloading the full message.
+    """
+    start = meta.upper().find(b'BODYSTRUCTURE')
+    if start == -1:
+        return None
+
+    stack = [[]]
+    for token in _IMAP_TOKEN_RE.findall(meta, start + len(b'BODYSTRUCTURE')):
+        if token == b'(':
+            stack.append([])
+        elif token == b')':
+            if len(stack) == 1:
+                return None
+            closed = stack.pop()
+            stack[-1].append(closed)
+            if len(stack) == 1:
+                return closed
+        elif len(stack) == 1 or token.startswith(b'{'):
+            return None
+        elif token.startswith(b'"'):
+            stack[-1].append(token[1:-1].replace(b'\\"', b'"').decode('utf-8', errors='ignore'))
+        elif token.upper() == b'NIL':
+            stack[-1].append(None)
+        else:
+            stack[-1].append(token.decode('ascii', errors='ignore'))
+    return None
+
+
+def _imap_params(values) -> Dict[str, str]:
+    """Convert an IMAP ("key" "value" ...) parameter list into a dict"""
+    if not isinstance(values, list):
+        return {}
+    return {
+        str(values[i]).lower(): values[i + 1]
+        for i in range(0, len(values) - 1, 2)
+        if values[i] is not None
+    }
+
+
+def _walk_bodystructure(node: list, section: str = ''):
+    """Yield (section, part_info) for every leaf part of a parsed BODYSTRUCTURE"""
+    if node and isinstance(node[0], list):
+        # Multipart: child parts come first, followed by the subtype and extension data
+        index = 0
+        for child in node:
+            if not isinstance(child, list):
+                break
+            index += 1
+            yield from _walk_bodystructure(child, f"{section}.{index}" if section else str(index))
+        return
+
+    main_type = str(node[0] or '').lower()
+    sub_type = str(node[1] or '').lower()
+    params = _imap_params(node[2])
+
+    # Extension data starts after the type-specific fields (md5 comes first, then disposition)
+    if main_type == 'text':
+        md5_index = 8
+    elif (main_type, sub_type) == ('message', 'rfc822'):
+        md5_index = 10
+    else:
+        md5_index = 7
+    disposition = node[md5_index + 1] if len(node) > md5_index + 1 else None
+
+    disposition_type, disposition_params = None, {}
+    if isinstance(disposition, list) and disposition:
+        disposition_type = str(disposition[0] or '').lower()
+        disposition_params = _imap_params(disposition[1] if len(disposition) > 1 else None)
+
+    encoding = str(node[5] or '7bit').lower()
+    size = int(node[6]) if str(node[6]).isdigit() else 0
+
+    yield section or '1', {
+        'content_type': f"{main_type}/{sub_type}",
+        'encoding': encoding,
+        # BODYSTRUCTURE reports encoded octets, base64 inflates payloads by 4/3
+        'size': size * 3 // 4 if encoding == 'base64' else size,
+        'disposition': disposition_type,
+        'filename': disposition_params.get('filename') or params.get('name')
+    }
+
+
+def _decode_transfer_encoding(payload: bytes, encoding: str) -> bytes:
+    """Undo the Content-Transfer-Encoding of a fetched body section"""
+    try:
+        if encoding == 'base64':
+            return base64.b64decode(payload)
+        if encoding == 'quoted-printable':
+            return quopri.decodestring(payload)
+    except Exception:
+        pass
+    return payload
+
 
 class EmailService:
     def __init__(self, db: Session = None):
@@ -63,28 +174,28 @@ class EmailService:
             for i in range(max_emails):
                 email_id = email_ids[-(i+1)]  # Get most recent first
 
-                status, msg_data = mail.fetch(email_id, '(RFC822)')
+                # Headers and MIME structure only - attachments are never downloaded
+                status, msg_data = mail.fetch(
+                    email_id, '(RFC822.SIZE BODYSTRUCTURE BODY.PEEK[HEADER])')
 
                 if status != 'OK':
                     continue
 
-                email_message = email.message_from_bytes(msg_data[0][1])
-
-                # Extract email data
-                email_data = {
-                    'id': email_id.decode(),
-                    'subject': email_message.get('Subject', ''),
-                    'from': email_message.get('From', ''),
-                    'to': email_message.get('To', ''),
-                    'date': email_message.get('Date', ''),
-                    'body': self._extract_email_body(email_message),
-                    'attachments': self._extract_attachments(email_message),
-                    'timestamp': datetime.now().isoformat(),
-                    'headers': dict(email_message.items()),
-                    'raw_message_id': email_message.get('Message-ID', ''),
-                    'content_type': email_message.get_content_type(),
-                    'size': len(msg_data[0][1]) if msg_data and msg_data[0] else 0
-                }
+                email_data = self._build_email_data_from_structure(
+                    mail, email_id, msg_data)
+
+                if email_data is None:
+                    # Structure could not be parsed - download the full message
+                    status, msg_data = mail.fetch(email_id, '(RFC822)')
+
+                    if status != 'OK':
+                        continue
+
+                    email_data = self._build_email_data(
+                        email_id,
+                        email.message_from_bytes(msg_data[0][1]),
+                        len(msg_data[0][1]) if msg_data and msg_data[0] else 0
+                    )
 
                 emails.append(email_data)
 
@@ -96,6 +207,103 @@ class EmailService:
         except Exception as e:
             raise Exception(f"Failed to fetch emails: {str(e)}")
 
+    def _build_email_data(self, email_id: bytes, email_message, size: int) -> Dict:
+        """Build the email dict from a fully downloaded RFC822 message"""
+        return {
+            'id': email_id.decode(),
+            'subject': email_message.get('Subject', ''),
+            'from': email_message.get('From', ''),
+            'to': email_message.get('To', ''),
+            'date': email_message.get('Date', ''),
+            'body': self._extract_email_body(email_message),
+            'attachments': self._extract_attachments(email_message),
+            'timestamp': datetime.now().isoformat(),
+            'headers': dict(email_message.items()),
+            'raw_message_id': email_message.get('Message-ID', ''),
+            'content_type': email_message.get_content_type(),
+            'size': size
+        }
+
+    def _build_email_data_from_structure(self, mail: imaplib.IMAP4_SSL, email_id: bytes,
+                                         msg_data: list) -> Optional[Dict]:
+        """Build the email dict from headers + BODYSTRUCTURE, fetching only text parts"""
+        header_bytes = None
+        meta = b''
+        for item in msg_data:
+            if isinstance(item, tuple):
+                meta += item[0]
+                if b'HEADER' in item[0].upper():
+                    header_bytes = item[1]
+            elif isinstance(item, bytes):
+                meta += item
+
+        structure = _parse_bodystructure(meta)
+        if header_bytes is None or structure is None:
+            return None
+
+        header_message = email.message_from_bytes(header_bytes)
+        parts = list(_walk_bodystructure(structure))
+        subject = header_message.get('Subject', '')
+        body = self._fetch_text_parts(mail, email_id, parts)
+
+        size_match = _FETCH_SIZE_RE.search(meta)
+
+        return {
+            'id': email_id.decode(),
+            'subject': subject,
+            'from': header_message.get('From', ''),
+            'to': header_message.get('To', ''),
+            'date': header_message.get('Date', ''),
+            'body': body,
+            'attachments': [
+                {
+                    'filename': part['filename'],
+                    'content_type': part['content_type'],
+                    'size': part['size']
+                }
+                for _, part in parts
+                if part['disposition'] == 'attachment' and part['filename']
+            ],
+            'timestamp': datetime.now().isoformat(),
+            'headers': dict(header_message.items()),
+            'raw_message_id': header_message.get('Message-ID', ''),
+            'content_type': header_message.get_content_type(),
+            'size': int(size_match.group(1)) if size_match else 0
+        }
+
+    def _fetch_text_parts(self, mail: imaplib.IMAP4_SSL, email_id: bytes, parts: List) -> str:
+        """Download only the inline text/plain and text/html sections of a message"""
+        text_parts = {
+            section: part for section, part in parts
+            if part['content_type'] in ('text/plain', 'text/html')
+            and part['disposition'] != 'attachment'
+        }
+        if not text_parts:
+            return ''
+
+        sections = ' '.join(f'BODY.PEEK[{section}]' for section in text_parts)
+        status, msg_data = mail.fetch(email_id, f'({sections})')
+        if status != 'OK':
+            return ''
+
+        body = ""
+        for item in msg_data:
+            if not isinstance(item, tuple):
+                continue
+            match = _FETCH_SECTION_RE.search(item[0])
+            part = text_parts.get(match.group(1).decode()) if match else None
+            if part is None:
+                continue
+
+            content = _decode_transfer_encoding(item[1], part['encoding']).decode(
+                'utf-8', errors='ignore')
+            if part['content_type'] == 'text/html':
+                # Simple HTML tag removal (consider using BeautifulSoup for better parsing)
+                content = re.sub('<[^<]+?>', '', content)
+            body += content
+
+        return body.strip()
+
     def _extract_email_body(self, email_message) -> str:
         """Extract email body content"""
         body = ""
@@ -145,16 +353,9 @@ class EmailService:
 
         for email_data in emails:
             # Check if email contains document-related keywords
-            document_keywords = [
-                'invoice', 'receipt', 'statement', 'report', 'contract',
-                'agreement', 'document', 'attachment', 'pdf', 'file'
-            ]
-
-            subject = email_data.get('subject', '').lower()
-            body = email_data.get('body', '').lower()
-
-            is_document_related = any(
-                keyword in subject or keyword in body for keyword in document_keywords)
+            is_document_related = bool(
+                _DOC_KW_RE.search(email_data.get('subject', '')) or
+                _DOC_KW_RE.search(email_data.get('body', '')))
 
             result = {
                 'email_id': email_data['id'],
@@ -3,26 +3,73 @@ English Text Summarization Service
 Uses BART and Pegasus models for English document summarization
 """
 
+import os
+import hashlib
 import logging
+import importlib.util
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache, cached_property
 from typing import Dict, Optional, List
 import asyncio
-from transformers import pipeline, AutoTokenizer, AutoModelForSeq2SeqLM
-import torch
 import re
+from cachetools import LRUCache
+
+try:
+    import ctranslate2
+    CTRANSLATE2_AVAILABLE = True
+except ImportError:
+    CTRANSLATE2_AVAILABLE = False
+    ctranslate2 = None
+
+# torch, transformers and the torch extensions are imported where they are used, so
+# importing this module (e.g. during app startup) doesn't pull in CUDA libraries
+TORCHAO_AVAILABLE = importlib.util.find_spec('torchao') is not None
+IPEX_AVAILABLE = importlib.util.find_spec('intel_extension_for_pytorch') is not None
 
 logger = logging.getLogger(__name__)
 
+# Preprocessing patterns, compiled once at import
+_WHITESPACE_RE = re.compile(r'\s+')
+_EMAIL_HEADER_RE = re.compile(r'From:.*?Subject:', re.DOTALL)
+_SIGNATURE_RE = re.compile(r'--.*?(?:\n|$)')
+_REGARDS_RE = re.compile(r'Best regards.*?$', re.MULTILINE)
+_DUPLICATE_PUNCT_RE = re.compile(r'([.!?])\s*([.!?])')
+
+@cache
+def configure_torch_compile():
+    """Process-wide torch.compile settings, applied once for every service that compiles models"""
+    import torch
+    torch._dynamo.config.suppress_errors = True  # fall back to eager on graph breaks
+
 class EnglishSummarizationService:
+    # Tokenizers shared between model keys, keyed by a config's 'tokenizer_family'.
+    # Models may only share a family if their tokenizers have identical vocab and merges.
+    _tokenizer_cache: Dict[str, object] = {}
+
     def __init__(self):
         self.models = {}
         self.tokenizers = {}
-        self.pipelines = {}
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.translators = {}
+        
+        # Optional CTranslate2 backend (models converted ahead of time into CT2_MODEL_DIR/<model_key>)
+        self.use_ct2 = bool(os.getenv('USE_CT2')) and CTRANSLATE2_AVAILABLE
+        self.ct2_model_dir = os.getenv('CT2_MODEL_DIR', 'models/ct2')
+        self.ct2_compute_type = os.getenv('CT2_COMPUTE_TYPE', 'int8_bfloat16')
+        
+        # Weight-only quantization for the 'auto' precision (torchao on GPU, dynamic int8 on CPU)
+        self.enable_quantization = bool(os.getenv('ENABLE_QUANTIZATION'))
+        
+        # Graph compilation (torch.compile on GPU, IPEX on CPU); slow first call, faster decoding after
+        self.enable_compile = bool(os.getenv('ENABLE_TORCH_COMPILE'))
+        if self.enable_compile:
+            configure_torch_compile()
         
         # Model configurations
         self.model_configs = {
             'bart-large-cnn': {
                 'name': 'facebook/bart-large-cnn',
+                'tokenizer_family': 'bart',
                 'max_input_length': 1024,
                 'max_output_length': 150,
                 'min_output_length': 30,
@@ -37,92 +84,313 @@ class EnglishSummarizationService:
             },
             'bart-base': {
                 'name': 'facebook/bart-base',
+                'tokenizer_family': 'bart',
                 'max_input_length': 1024,
                 'max_output_length': 142,
                 'min_output_length': 28,
+                'quantization': 'int4',
                 'description': 'BART base model for general summarization'
             }
         }
         
         self.default_model = 'bart-large-cnn'
+        self.final_stage_model = 'bart-base'  # re-summarizes combined chunk summaries
+        self.default_precision = 'auto'  # half precision on GPU, fp32 on CPU
         self.initialized_models = set()
+        self.model_precisions = {}
+        self.max_batch_size = 8  # chunks summarized per generate call
+        self.chunk_overlap_tokens = 0  # tokens shared between consecutive chunks
+        
+        # Greedy decoding by default; beam search multiplies decoder compute and K/V cache by num_beams
+        self.num_beams = int(os.getenv('SUMMARIZER_NUM_BEAMS', '1'))
+        
+        # Model loading and inference block, so they run on worker threads instead of the event loop
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('SUMMARIZER_WORKERS', '2')),
+            thread_name_prefix='english-summarizer'
+        )
+        self._init_lock = threading.Lock()
+        self._cache_lock = threading.Lock()  # cachetools caches are not thread-safe
+        
+        # Preprocessed text keyed by a digest of the raw input
+        self._preprocess_cache = LRUCache(maxsize=256)
+        
+        # Token ids keyed by (tokenizer, text digest), shared by repeated and multi-model runs
+        self._token_cache = LRUCache(maxsize=256)
+        self.token_cache_max_text = 100_000  # characters; longer documents are not cached
+
+    @cached_property
+    def device(self) -> str:
+        """Inference device, resolved on first use"""
+        import torch
+        return "cuda" if torch.cuda.is_available() else "cpu"
 
-    async def initialize_model(self, model_key: str) -> bool:
+    async def initialize_model(self, model_key: str, precision: str = None) -> bool:
         """Initialize a specific model"""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._initialize_model_sync, model_key, precision
+        )
+
+    def _initialize_model_sync(self, model_key: str, precision: str = None) -> bool:
+        """Load a model, serialized so concurrent requests don't load the same weights twice"""
+        with self._init_lock:
+            return self._load_model(model_key, precision)
+
+    def _load_model(self, model_key: str, precision: str = None) -> bool:
+        """Load tokenizer and model weights for model_key at the requested precision"""
+        precision = precision or self.default_precision
+        if precision == 'auto' and self.enable_quantization:
+            precision = self.model_configs.get(model_key, {}).get('quantization', 'int8')
         if model_key in self.initialized_models:
-            return True
+            if self.model_precisions.get(model_key) == precision:
+                return True
+            # Requested precision differs from the loaded one - reload below
+            self.initialized_models.discard(model_key)
             
         if model_key not in self.model_configs:
             logger.error(f"Unknown model key: {model_key}")
             return False
             
         try:
+            from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+            
             config = self.model_configs[model_key]
             model_name = config['name']
             
             logger.info(f"Initializing {model_name} for English summarization...")
             
-            # Initialize tokenizer and model
-            self.tokenizers[model_key] = AutoTokenizer.from_pretrained(model_name)
-            self.models[model_key] = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+            # Initialize tokenizer (reused across models of the same family) and model
+            tokenizer_key = config.get('tokenizer_family', model_name)
+            tokenizer = self._tokenizer_cache.get(tokenizer_key)
+            if tokenizer is None:
+                tokenizer = AutoTokenizer.from_pretrained(model_name)
+                self._tokenizer_cache[tokenizer_key] = tokenizer
+            self.tokenizers[model_key] = tokenizer
             
-            # Create pipeline
-            self.pipelines[model_key] = pipeline(
-                'summarization',
-                model=self.models[model_key],
-                tokenizer=self.tokenizers[model_key],
-                device=0 if self.device == "cuda" else -1
-            )
+            if self.use_ct2:
+                # CTranslate2 runs its own quantized kernels, compute_type replaces precision
+                self.translators[model_key] = ctranslate2.Translator(
+                    os.path.join(self.ct2_model_dir, model_key),
+                    device=self.device,
+                    compute_type=self.ct2_compute_type
+                )
+            else:
+                model = AutoModelForSeq2SeqLM.from_pretrained(
+                    model_name, torch_dtype=self._resolve_dtype(precision)
+                ).to(self.device)
+                model.eval()
+                
+                # Quantize after moving to the device, torchao packs weights for the target backend
+                model = self._apply_precision(model, precision)
+                if self.enable_compile:
+                    model = self._compile_model(model, precision)
+                self.models[model_key] = model
             
             self.initialized_models.add(model_key)
-            logger.info(f"✅ {model_name} initialized successfully")
+            self.model_precisions[model_key] = precision
+            logger.info(f"✅ {model_name} initialized successfully ({precision})")
             return True
             
         except Exception as e:
             logger.error(f"❌ Failed to initialize {model_key}: {e}")
             return False
 
+    def _resolve_dtype(self, precision: str) -> 'torch.dtype':
+        """Pick the floating point dtype to load model weights in"""
+        import torch
+        
+        if self.device != "cuda" or precision == 'fp32':
+            # CPU stays in fp32, half precision only pays off on AVX-512 BF16 hardware
+            return torch.float32
+        if precision == 'fp16':
+            return torch.float16
+        if precision in ('bf16', 'int4') or torch.cuda.get_device_capability()[0] >= 8:
+            # Ampere and newer have bf16 tensor cores without fp16's overflow risk
+            return torch.bfloat16
+        return torch.float16
+
+    def _apply_precision(self, model, precision: str):
+        """Quantize a loaded model when int8/int4 inference is requested"""
+        import torch
+        
+        if precision in ('int8', 'int4'):
+            if self.device == "cpu":
+                # Dynamic int8 quantization of the Linear layers (CPU kernels only)
+                return torch.ao.quantization.quantize_dynamic(
+                    model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+            if TORCHAO_AVAILABLE:
+                from torchao.quantization import quantize_, int8_weight_only, int4_weight_only
+                # Weight-only quantization keeps activations in half precision
+                quantize_(model, int4_weight_only() if precision == 'int4' else int8_weight_only())
+                return model
+            logger.warning("torchao not installed, using half precision on GPU without quantization")
+        
+        # Other precisions are applied through torch_dtype at load time
+        return model
+
+    def _compile_model(self, model, precision: str):
+        """Compile the encoder and decoder steps, leaving the model eager if that fails"""
+        import torch
+        
+        try:
+            if self.device == "cuda":
+                # generate() itself stays in Python, so compile the forwards it calls per step
+                encoder = model.get_encoder()
+                encoder.forward = torch.compile(encoder.forward, mode='reduce-overhead', dynamic=True)
+                model.forward = torch.compile(model.forward, mode='reduce-overhead', dynamic=True)
+            elif IPEX_AVAILABLE and precision not in ('int8', 'int4'):
+                import intel_extension_for_pytorch as ipex
+                # Fused fp32 CPU kernels; dynamically quantized models are left as they are
+                model = ipex.optimize(model)
+        except Exception as e:
+            logger.warning(f"Model compilation failed, using eager mode: {e}")
+        return model
+
+    def _generate_summary(self, model_key: str, text: str, max_length: int, min_length: int) -> str:
+        """Run a single summarization pass with the backend loaded for model_key"""
+        return self._generate_summaries(model_key, [text], max_length, min_length)[0]
+
+    def _generate_summaries(self, model_key: str, texts: List[str], max_length: int, min_length: int) -> List[str]:
+        """Summarize several texts with batched forward passes"""
+        tokenizer = self.tokenizers[model_key]
+        max_input_length = self.model_configs[model_key]['max_input_length']
+        batch_ids = [
+            tokenizer(text, truncation=True, max_length=max_input_length)['input_ids']
+            for text in texts
+        ]
+        return self._generate_from_ids(model_key, batch_ids, max_length, min_length)
+
+    def _generate_from_ids(self, model_key: str, batch_ids: List[List[int]], max_length: int, min_length: int) -> List[str]:
+        """Summarize already tokenized inputs (special tokens included)"""
+        import torch
+        
+        tokenizer = self.tokenizers[model_key]
+        
+        if model_key in self.translators:
+            results = self.translators[model_key].translate_batch(
+                [tokenizer.convert_ids_to_tokens(input_ids) for input_ids in batch_ids],
+                max_batch_size=self.max_batch_size,
+                max_decoding_length=max_length,
+                min_decoding_length=min_length,
+                beam_size=self.num_beams
+            )
+            return [
+                tokenizer.decode(tokenizer.convert_tokens_to_ids(result.hypotheses[0]), skip_special_tokens=True)
+                for result in results
+            ]
+        
+        model = self.models[model_key]
+        batches = [
+            tokenizer.pad({'input_ids': batch_ids[start:start + self.max_batch_size]}, return_tensors='pt')
+            for start in range(0, len(batch_ids), self.max_batch_size)
+        ]
+        
+        use_streams = self.device == "cuda" and len(batches) > 1
+        if use_streams:
+            # Double-buffer host->device copies: batch i+1 is copied on a side stream
+            # while batch i is generated on the default stream
+            copy_stream = torch.cuda.Stream()
+            
+            def prefetch(batch):
+                with torch.cuda.stream(copy_stream):
+                    return {
+                        name: tensor.pin_memory().to(self.device, non_blocking=True)
+                        for name, tensor in batch.items()
+                    }
+            
+            next_inputs = prefetch(batches[0])
+        
+        summaries = []
+        for index, batch in enumerate(batches):
+            if use_streams:
+                compute_stream = torch.cuda.current_stream()
+                compute_stream.wait_stream(copy_stream)
+                inputs = next_inputs
+                for tensor in inputs.values():
+                    # Tensors were allocated on the copy stream, keep them alive for the compute stream
+                    tensor.record_stream(compute_stream)
+                if index + 1 < len(batches):
+                    next_inputs = prefetch(batches[index + 1])
+            else:
+                inputs = batch.to(self.device)
+            
+            with torch.inference_mode():
+                # Encode once up front; generate() reuses the encoder states and the decoder K/V cache
+                encoder_outputs = model.get_encoder()(
+                    input_ids=inputs['input_ids'],
+                    attention_mask=inputs['attention_mask']
+                )
+                output_ids = model.generate(
+                    encoder_outputs=encoder_outputs,
+                    attention_mask=inputs['attention_mask'],
+                    max_length=max_length,
+                    min_length=min_length,
+                    num_beams=self.num_beams,
+                    early_stopping=self.num_beams > 1,
+                    do_sample=False,
+                    use_cache=True
+                )
+            summaries.extend(tokenizer.batch_decode(output_ids, skip_special_tokens=True))
+        
+        return summaries
+
+    def _tokenize(self, tokenizer, text: str) -> List[int]:
+        """Tokenize text without special tokens, reusing earlier results for the same tokenizer"""
+        if len(text) > self.token_cache_max_text:
+            return tokenizer(text, add_special_tokens=False)['input_ids']
+        
+        cache_key = (
+            tokenizer.name_or_path,
+            hashlib.blake2b(text.encode('utf-8', errors='surrogatepass'), digest_size=16).digest()
+        )
+        with self._cache_lock:
+            ids = self._token_cache.get(cache_key)
+        if ids is None:
+            ids = tokenizer(text, add_special_tokens=False)['input_ids']
+            with self._cache_lock:
+                self._token_cache[cache_key] = ids
+        return ids
+
+    def chunk_token_ids(self, model_key: str, text: str) -> List[List[int]]:
+        """Tokenize text once and split it into windows that fill the model input"""
+        tokenizer = self.tokenizers[model_key]
+        ids = self._tokenize(tokenizer, text)
+        
+        max_tokens = self.model_configs[model_key]['max_input_length'] - tokenizer.num_special_tokens_to_add()
+        step = max_tokens - self.chunk_overlap_tokens
+        
+        return [
+            tokenizer.build_inputs_with_special_tokens(ids[start:start + max_tokens])
+            for start in range(0, max(len(ids), 1), step)
+        ]
+
     def preprocess_text(self, text: str) -> str:
         """Preprocess text for better summarization"""
         if not text:
             return ""
         
-        # Remove excessive whitespace and newlines
-        text = re.sub(r'\n+', ' ', text)
-        text = re.sub(r'\s+', ' ', text)
+        text_hash = hashlib.blake2b(text.encode('utf-8', errors='surrogatepass'), digest_size=16).digest()
+        with self._cache_lock:
+            cached = self._preprocess_cache.get(text_hash)
+        if cached is not None:
+            return cached
+        
+        # Remove excessive whitespace and newlines (\s covers \n, one pass is enough)
+        text = _WHITESPACE_RE.sub(' ', text)
         
         # Remove email headers and signatures
-        text = re.sub(r'From:.*?Subject:', 'Subject:', text, flags=re.DOTALL)
-        text = re.sub(r'--.*?(?:\n|$)', '', text)
-        text = re.sub(r'Best regards.*?$', '', text, flags=re.MULTILINE)
+        text = _EMAIL_HEADER_RE.sub('Subject:', text)
+        text = _SIGNATURE_RE.sub('', text)
+        text = _REGARDS_RE.sub('', text)
         
         # Clean up punctuation
-        text = re.sub(r'([.!?])\s*([.!?])', r'\1', text)  # Remove duplicate punctuation
-        
-        return text.strip()
-
-    def chunk_text(self, text: str, max_length: int = 1000) -> List[str]:
-        """Split text into manageable chunks for processing"""
-        sentences = re.split(r'[.!?]+', text)
-        chunks = []
-        current_chunk = ""
-        
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
-                continue
-                
-            if len(current_chunk + sentence) < max_length:
-                current_chunk += sentence + ". "
-            else:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = sentence + ". "
+        text = _DUPLICATE_PUNCT_RE.sub(r'\1', text)  # Remove duplicate punctuation
         
-        if current_chunk:
-            chunks.append(current_chunk.strip())
-            
-        return chunks
+        text = text.strip()
+        with self._cache_lock:
+            self._preprocess_cache[text_hash] = text
+        return text
 
     async def summarize_with_model(
         self, 
@@ -130,16 +398,33 @@ class EnglishSummarizationService:
         model_key: str = None,
         max_length: int = None,
         min_length: int = None,
-        role_context: str = None
+        role_context: str = None,
+        precision: str = None
     ) -> Dict[str, any]:
         """Summarize text using specified model"""
         
         model_key = model_key or self.default_model
         
         # Ensure model is initialized
-        if not await self.initialize_model(model_key):
+        if not await self.initialize_model(model_key, precision):
             raise Exception(f"Failed to initialize model: {model_key}")
         
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor,
+            self._summarize_sync,
+            text, model_key, max_length, min_length, role_context, precision
+        )
+
+    def _summarize_sync(
+        self,
+        text: str,
+        model_key: str,
+        max_length: int = None,
+        min_length: int = None,
+        role_context: str = None,
+        precision: str = None
+    ) -> Dict[str, any]:
+        """Blocking body of summarize_with_model, runs on the worker pool"""
         config = self.model_configs[model_key]
         max_length = max_length or config['max_output_length']
         min_length = min_length or config['min_output_length']
@@ -157,46 +442,32 @@ class EnglishSummarizationService:
             }
         
         try:
-            # Handle long texts by chunking
-            chunks = self.chunk_text(processed_text, config['max_input_length'] - 100)
+            # Handle long texts by chunking on token boundaries, tokenizing the document only once
+            chunks = self.chunk_token_ids(model_key, processed_text)
             
             if len(chunks) == 1:
                 # Single chunk processing
-                result = self.pipelines[model_key](
-                    processed_text,
-                    max_length=max_length,
-                    min_length=min_length,
-                    do_sample=False,
-                    truncation=True
-                )
-                summary = result[0]['summary_text']
+                summary = self._generate_from_ids(model_key, chunks, max_length, min_length)[0]
                 
             else:
-                # Multi-chunk processing
-                chunk_summaries = []
-                for chunk in chunks:
-                    result = self.pipelines[model_key](
-                        chunk,
-                        max_length=max_length // len(chunks) + 20,
-                        min_length=max(10, min_length // len(chunks)),
-                        do_sample=False,
-                        truncation=True
-                    )
-                    chunk_summaries.append(result[0]['summary_text'])
+                # Multi-chunk processing, all chunks go through the model as one batch
+                chunk_summaries = self._generate_from_ids(
+                    model_key,
+                    chunks,
+                    max_length // len(chunks) + 20,
+                    max(10, min_length // len(chunks))
+                )
                 
                 # Combine chunk summaries
                 combined_text = " ".join(chunk_summaries)
                 
-                # Final summarization of combined chunks
+                # Final summarization of combined chunks; the input is already condensed,
+                # so a smaller model does this pass unless it can't be loaded
                 if len(combined_text) > config['max_input_length']:
-                    result = self.pipelines[model_key](
-                        combined_text,
-                        max_length=max_length,
-                        min_length=min_length,
-                        do_sample=False,
-                        truncation=True
-                    )
-                    summary = result[0]['summary_text']
+                    final_key = self.final_stage_model or model_key
+                    if not self._initialize_model_sync(final_key, precision):
+                        final_key = model_key
+                    summary = self._generate_summary(final_key, combined_text, max_length, min_length)
                 else:
                     summary = combined_text
             
@@ -210,6 +481,7 @@ class EnglishSummarizationService:
                 'confidence': 0.85,
                 'method': 'multi-chunk' if len(chunks) > 1 else 'single-chunk',
                 'chunks_processed': len(chunks),
+                'backend': 'ctranslate2' if model_key in self.translators else 'transformers',
                 'original_length': len(text),
                 'summary_length': len(summary)
             }
@@ -252,27 +524,32 @@ class EnglishSummarizationService:
         models = models or ['bart-large-cnn', 'pegasus-cnn']
         role_contexts = role_contexts or ['staff', 'manager', 'director']
         
-        results = {}
+        # Role summaries only differ by prefix, so they reuse the default model's run
+        run_models = list(dict.fromkeys(list(models) + [self.default_model]))
+        outcomes = await asyncio.gather(
+            *(self.summarize_with_model(text, model) for model in run_models),
+            return_exceptions=True
+        )
+        
+        summaries = {}
+        for model, outcome in zip(run_models, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Failed to generate summary with {model}: {outcome}")
+            else:
+                summaries[model] = outcome
         
-        # Generate model-based summaries
-        for model in models:
-            try:
-                result = await self.summarize_with_model(text, model)
-                results[f'model_{model}'] = result
-            except Exception as e:
-                logger.error(f"Failed to generate summary with {model}: {e}")
+        results = {f'model_{model}': summaries[model] for model in models if model in summaries}
+        
+        base = summaries.get(self.default_model)
+        if base is None:
+            return results
         
-        # Generate role-specific summaries
         for role in role_contexts:
-            try:
-                result = await self.summarize_with_model(
-                    text, 
-                    self.default_model,
-                    role_context=role
-                )
-                results[f'role_{role}'] = result
-            except Exception as e:
-                logger.error(f"Failed to generate {role} summary: {e}")
+            result = dict(base)
+            if base.get('method') not in ('passthrough', 'truncation'):
+                result['summary'] = self.adapt_summary_for_role(base['summary'], role)
+                result['summary_length'] = len(result['summary'])
+            results[f'role_{role}'] = result
         
         return results
 
@@ -283,9 +560,41 @@ class EnglishSummarizationService:
             'initialized_models': list(self.initialized_models),
             'default_model': self.default_model,
             'device': self.device,
+            'backend': 'ctranslate2' if self.use_ct2 else 'transformers',
+            'model_precisions': self.model_precisions,
             'model_details': self.model_configs
         }
 
+    async def warmup(self, model_key: str = None, precision: str = None) -> bool:
+        """Load a model and run dummy generations so the first request doesn't pay for setup"""
+        model_key = model_key or self.default_model
+        if not await self.initialize_model(model_key, precision):
+            return False
+        
+        # Load the final-stage model too, long documents need it on their first request
+        if self.final_stage_model:
+            await self.initialize_model(self.final_stage_model, precision)
+        
+        try:
+            # First pass triggers kernel autotuning / graph capture, second runs at steady state.
+            # Run them on the worker pool, where real requests will execute
+            loop = asyncio.get_running_loop()
+            for _ in range(2):
+                await loop.run_in_executor(
+                    self._executor, self._generate_summary, model_key, "warmup text " * 20, 30, 10
+                )
+            
+            if self.device == "cuda":
+                import torch
+                torch.cuda.synchronize()
+            
+            logger.info(f"🔥 {model_key} warmed up")
+            return True
+            
+        except Exception as e:
+            logger.warning(f"Warmup failed for {model_key}: {e}")
+            return False
+
     async def health_check(self) -> Dict[str, any]:
         """Health check for the service"""
         try:
@@ -3,31 +3,60 @@ Language Detection Service
 Detects document language (English, Malayalam, or bilingual)
 """
 
+import os
 import re
+import copy
+import hashlib
 from typing import Dict, List, Tuple
-from langdetect import detect, detect_langs
-from langdetect.lang_detect_exception import LangDetectException
+import numpy as np
+from cachetools import LRUCache
 import logging
 
+try:
+    import fasttext
+    FASTTEXT_AVAILABLE = True
+except ImportError:
+    FASTTEXT_AVAILABLE = False
+    fasttext = None
+
 logger = logging.getLogger(__name__)
 
+# str.isalpha() for every Basic Multilingual Plane code point, so character
+# classes can be counted with array lookups instead of a Python loop
+_BMP_ALPHA = np.fromiter((chr(i).isalpha() for i in range(0x10000)), dtype=bool, count=0x10000)
+
 class LanguageDetectionService:
     def __init__(self):
         # Malayalam script Unicode ranges
         self.malayalam_range = (0x0D00, 0x0D7F)  # Malayalam Unicode block
         
         # Common Malayalam words for validation
-        self.malayalam_indicators = [
+        self.malayalam_indicators = frozenset([
             'ആ', 'ഇ', 'ഉ', 'എ', 'ഒ', 'കാ', 'കി', 'കു', 'കെ', 'കോ',
             'മാ', 'മി', 'മു', 'മെ', 'മോ', 'ന്', 'ണ്', 'ത്', 'ര്', 'ല്',
             'യാ', 'വാ', 'സാ', 'ഹാ', 'ഗാ', 'ദാ', 'ബാ', 'ഫാ', 'ജാ', 'ഖാ'
-        ]
+        ])
         
         # English indicators
-        self.english_indicators = [
+        self.english_indicators = frozenset([
             'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
             'of', 'with', 'by', 'from', 'about', 'into', 'through', 'during'
-        ]
+        ])
+        
+        # Punctuation stripper used before word splitting
+        self._non_word_re = re.compile(r'[^\w\s]')
+        
+        # Detection results keyed by a digest of the input text
+        self._detection_cache = LRUCache(maxsize=1024)
+        
+        # fastText lid.176 language ID model (C++), langdetect is used when it can't be loaded
+        self.fasttext_model = None
+        fasttext_model_path = os.getenv('FASTTEXT_LID_MODEL', 'models/lid.176.ftz')
+        if FASTTEXT_AVAILABLE and os.path.exists(fasttext_model_path):
+            try:
+                self.fasttext_model = fasttext.load_model(fasttext_model_path)
+            except Exception as e:
+                logger.warning(f"Failed to load fastText model {fasttext_model_path}: {e}")
 
     def is_malayalam_character(self, char: str) -> bool:
         """Check if character is in Malayalam Unicode range"""
@@ -41,14 +70,50 @@ class LanguageDetectionService:
         """Get ratio of Malayalam characters in text"""
         if not text:
             return 0.0
-            
-        malayalam_chars = sum(1 for char in text if self.is_malayalam_character(char))
-        total_chars = len([c for c in text if c.isalpha()])
         
+        malayalam_chars, total_chars = self._count_script_chars(text)
         return malayalam_chars / total_chars if total_chars > 0 else 0.0
 
+    def _count_script_chars(self, text: str) -> Tuple[int, int]:
+        """Count Malayalam code points and alphabetic characters in one scan"""
+        codepoints = np.frombuffer(text.encode('utf-32-le', errors='surrogatepass'), dtype=np.uint32)
+        
+        malayalam_chars = np.count_nonzero(
+            (codepoints >= self.malayalam_range[0]) & (codepoints <= self.malayalam_range[1])
+        )
+        
+        in_bmp = codepoints < 0x10000
+        total_chars = np.count_nonzero(_BMP_ALPHA[codepoints[in_bmp]])
+        if not in_bmp.all():
+            # Astral-plane characters are rare (emoji, historic scripts), check them directly
+            total_chars += sum(1 for cp in codepoints[~in_bmp] if chr(cp).isalpha())
+        
+        return int(malayalam_chars), int(total_chars)
+
+    def _analyze(self, text: str) -> Tuple[float, float, int]:
+        """
+        Gather all script statistics for text at once
+        Returns (Malayalam ratio, English indicator word fraction, alphabetic character count)
+        """
+        malayalam_chars, alpha_chars = self._count_script_chars(text)
+        malayalam_ratio = malayalam_chars / alpha_chars if alpha_chars > 0 else 0.0
+        
+        words = self._non_word_re.sub(' ', text.lower()).split()
+        english_word_count = sum(1 for word in words if word in self.english_indicators)
+        english_word_frac = english_word_count / (len(words) if words else 1)
+        
+        return malayalam_ratio, english_word_frac, alpha_chars
+
     def detect_with_langdetect(self, text: str) -> Dict[str, float]:
         """Use langdetect library for language detection"""
+        try:
+            # Imported on first use so detection still works (script analysis only) without langdetect
+            from langdetect import detect_langs
+            from langdetect.lang_detect_exception import LangDetectException
+        except ImportError:
+            logger.warning("langdetect not installed, relying on script analysis")
+            return {'english': 0.0, 'malayalam': 0.0, 'other': 0.0}
+        
         try:
             # Get language probabilities
             lang_probs = detect_langs(text)
@@ -69,24 +134,37 @@ class LanguageDetectionService:
             logger.warning("langdetect failed, using fallback method")
             return {'english': 0.0, 'malayalam': 0.0, 'other': 0.0}
 
-    def detect_with_script_analysis(self, text: str) -> Dict[str, float]:
+    def detect_with_fasttext(self, text: str) -> Dict[str, float]:
+        """Use the fastText lid.176 model for language detection"""
+        try:
+            # predict() works on a single line of text
+            labels, probs = self.fasttext_model.predict(text.replace('\n', ' '), k=3)
+        except Exception as e:
+            logger.warning(f"fastText prediction failed, using langdetect: {e}")
+            return self.detect_with_langdetect(text)
+        
+        result = {'english': 0.0, 'malayalam': 0.0, 'other': 0.0}
+        
+        for label, prob in zip(labels, probs):
+            if label == '__label__en':
+                result['english'] = float(prob)
+            elif label == '__label__ml':
+                result['malayalam'] = float(prob)
+            else:
+                result['other'] += float(prob)
+                
+        return result
+
+    def detect_with_script_analysis(self, text: str, analysis: Tuple[float, float, int] = None) -> Dict[str, float]:
         """Detect language using script analysis"""
         if not text or len(text.strip()) < 10:
             return {'english': 0.0, 'malayalam': 0.0, 'confidence': 0.0}
         
-        # Clean text
-        clean_text = re.sub(r'[^\w\s]', ' ', text.lower())
-        words = clean_text.split()
-        
-        malayalam_ratio = self.get_malayalam_ratio(text)
-        
-        # Count indicator words
-        english_word_count = sum(1 for word in words if word in self.english_indicators)
+        malayalam_ratio, english_word_frac, _ = analysis or self._analyze(text)
         malayalam_char_presence = malayalam_ratio > 0.1
         
         # Calculate probabilities
-        total_words = len(words) if words else 1
-        english_prob = min(0.95, english_word_count / total_words * 2)
+        english_prob = min(0.95, english_word_frac * 2)
         malayalam_prob = min(0.95, malayalam_ratio * 1.5)
         
         # Adjust for mixed content
@@ -116,11 +194,34 @@ class LanguageDetectionService:
                 'recommended_models': []
             }
         
+        text_hash = hashlib.blake2b(text.encode('utf-8', errors='surrogatepass'), digest_size=16).digest()
+        result = self._detection_cache.get(text_hash)
+        if result is None:
+            result = self._detect_language_uncached(text)
+            self._detection_cache[text_hash] = result
+        
+        # Callers get their own copy so the cached entry can't be mutated
+        return copy.deepcopy(result)
+
+    def _detect_language_uncached(self, text: str) -> Dict[str, any]:
+        """Run script analysis and langdetect on text"""
+        analysis = self._analyze(text)
+        malayalam_ratio = analysis[0]
+        is_ascii = text.isascii()
+        
         # Method 1: Script analysis (more reliable for Malayalam)
-        script_result = self.detect_with_script_analysis(text)
+        script_result = self.detect_with_script_analysis(text, analysis)
         
-        # Method 2: langdetect library
-        langdetect_result = self.detect_with_langdetect(text)
+        # Method 2: statistical language ID (fastText when available, else langdetect)
+        if malayalam_ratio > 0.85:
+            # Single-script document, the statistical model is certain; skip running it
+            langdetect_result = {'english': 0.0, 'malayalam': 1.0}
+        elif malayalam_ratio == 0 and is_ascii:
+            langdetect_result = {'english': 1.0, 'malayalam': 0.0}
+        elif self.fasttext_model is not None:
+            langdetect_result = self.detect_with_fasttext(text)
+        else:
+            langdetect_result = self.detect_with_langdetect(text)
         
         # Combine results (weighted average, favoring script analysis for Malayalam)
         english_prob = (script_result['english'] * 0.7 + langdetect_result['english'] * 0.3)
@@ -167,7 +268,7 @@ class LanguageDetectionService:
             'is_bilingual': is_bilingual,
             'recommended_models': recommended_models,
             'text_length': len(text),
-            'malayalam_script_ratio': round(self.get_malayalam_ratio(text), 3)
+            'malayalam_script_ratio': round(malayalam_ratio, 3)
         }
 
     def _get_recommended_models(self, primary_language: str, is_bilingual: bool, malayalam_prob: float) -> List[str]:
@@ -3,22 +3,80 @@ Malayalam Text Summarization Service
 Uses IndicBART and mT5 models for Malayalam and bilingual document summarization
 """
 
+import os
+import gc
+import bisect
+import functools
+import hashlib
+import importlib.util
 import logging
+import threading
+from collections import OrderedDict
 from typing import Dict, Optional, List
 import asyncio
-from transformers import pipeline, AutoTokenizer, AutoModelForSeq2SeqLM, MBart50TokenizerFast, MBartForConditionalGeneration
-import torch
 import re
+from cachetools import LRUCache
+
+from .english_summarization_service import configure_torch_compile
+from .language_detection_service import get_language_detector
+
+try:
+    # RE2 matches in linear time (DFA, no backtracking); the patterns below avoid
+    # backreferences so they compile with either engine
+    import re2 as fast_re
+    RE2_AVAILABLE = True
+except ImportError:
+    fast_re = re
+    RE2_AVAILABLE = False
+
+FLASH_ATTN_AVAILABLE = importlib.util.find_spec('flash_attn') is not None
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+    xxhash = None
+
+try:
+    import ctranslate2
+    CTRANSLATE2_AVAILABLE = True
+except ImportError:
+    CTRANSLATE2_AVAILABLE = False
+    ctranslate2 = None
 
 logger = logging.getLogger(__name__)
 
 class MalayalamSummarizationService:
-    def __init__(self):
+    def __init__(self, cpu_threads: int = None):
         self.models = {}
         self.tokenizers = {}
         self.pipelines = {}
+        self.translators = {}
+        
+        # torch and transformers are imported where used, the service is only built on first use
+        import torch
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         
+        # CPU threads per inference: 1 for concurrent serving, 0 for all cores (single-request deployments).
+        # Unset by default so torch keeps its own thread count.
+        if cpu_threads is None and os.getenv('SUMMARIZER_CPU_THREADS'):
+            cpu_threads = int(os.getenv('SUMMARIZER_CPU_THREADS'))
+        self.cpu_threads = None if cpu_threads is None else cpu_threads or os.cpu_count()
+        if self.device == "cpu" and self.cpu_threads is not None:
+            self._configure_cpu_threads()
+        
+        # Optional CTranslate2 backend (models exported on first use into CT2_MODEL_DIR/<model_key>)
+        self.use_ct2 = bool(os.getenv('USE_CT2')) and CTRANSLATE2_AVAILABLE
+        self.ct2_model_dir = os.getenv('CT2_MODEL_DIR', 'models/ct2')
+        self.ct2_compute_type = os.getenv('CT2_COMPUTE_TYPE', 'int8_bfloat16')
+        
+        # torch.compile + CUDA graphs for the decoder step (GPU only); inputs are padded
+        # to a fixed length so the captured graphs are reused across calls
+        self.enable_compile = bool(os.getenv('ENABLE_TORCH_COMPILE')) and self.device == "cuda"
+        if self.enable_compile:
+            configure_torch_compile()
+        
         # Model configurations for Malayalam/Multilingual models
         self.model_configs = {
             'indicbart': {
@@ -56,7 +114,26 @@ class MalayalamSummarizationService:
         }
         
         self.default_model = 'indicbart'
-        self.initialized_models = set()
+        self.default_precision = 'auto'  # bf16/fp16 on GPU, dynamic int8 on CPU
+        self.initialized_models = OrderedDict()  # model keys, least recently used first
+        # Models kept loaded at once, the least recently used one is unloaded to make room
+        # (default 2 on GPU, 0 = unlimited on CPU)
+        self.max_resident_models = int(
+            os.getenv('MALAYALAM_MAX_RESIDENT_MODELS', '2' if self.device == "cuda" else '0')
+        )
+        self.model_precisions = {}
+        # One lock for eviction and loading across all models, so concurrent first requests
+        # for different models can't overshoot max_resident_models
+        self._model_lock = asyncio.Lock()
+        # In-flight generations per model key; pinned models are never unloaded
+        self._model_refs: Dict[str, int] = {}
+        self._model_released = asyncio.Event()
+        # mBART's src_lang lives on the shared tokenizer; worker threads set it and tokenize under this lock
+        self._mbart_tokenizer_lock = threading.Lock()
+        self._summary_cache = LRUCache(maxsize=512)  # summarize_with_model results by request digest
+        self.max_batch_size = 8  # chunks summarized per generate call
+        # Beam width for every backend; each extra beam multiplies decoder compute and K/V cache
+        self.num_beams = int(os.getenv('SUMMARIZER_NUM_BEAMS', '2'))
         
         # Malayalam language processing patterns
         self.malayalam_patterns = {
@@ -65,17 +142,103 @@ class MalayalamSummarizationService:
             'numbers': r'[\u0D66-\u0D6F]',      # Malayalam numerals
             'punctuation': r'[\u0D4D\u0D3E-\u0D4C]'  # Malayalam vowel signs
         }
+        
+        # Preprocessing patterns, compiled once per service (RE2 when installed).
+        # The Malayalam block is given as literal characters since RE2 has no \u escapes.
+        self._re_ws = fast_re.compile(r'\s+')
+        self._re_en_ml = fast_re.compile('([a-zA-Z]+)([\u0D00-\u0D7F])')
+        self._re_hdr = fast_re.compile(r'(?s)From:.*?Subject:')
+        self._re_dash = fast_re.compile(r'--.*?(?:\n|$)')
+        self._re_punct = fast_re.compile(r'([.!?।])\s*([.!?।])')
+        self._re_sentence_end = fast_re.compile(self.malayalam_patterns['sentence_endings'])
 
-    async def initialize_model(self, model_key: str) -> bool:
+    def _configure_cpu_threads(self):
+        """Size torch's intra-op pool, and the inter-op pool for single-thread serving.
+        The pools are process-wide: the English summarizer and embedding model share them."""
+        import torch
+        torch.set_num_threads(self.cpu_threads)
+        if self.cpu_threads == 1:
+            try:
+                torch.set_num_interop_threads(1)
+            except RuntimeError:
+                # Only allowed before the first parallel op; keep the existing inter-op pool
+                pass
+
+    async def initialize_model(self, model_key: str, precision: str = None) -> bool:
         """Initialize a specific model for Malayalam/multilingual summarization"""
-        if model_key in self.initialized_models:
+        precision = precision or self.default_precision
+        if model_key in self.initialized_models and self.model_precisions.get(model_key) == precision:
+            self.initialized_models.move_to_end(model_key)
             return True
             
         if model_key not in self.model_configs:
             logger.error(f"Unknown model key: {model_key}")
             return False
+        
+        # One load at a time, concurrent first requests wait for it instead of downloading
+        # again; the blocking load runs in a worker thread
+        async with self._model_lock:
+            if model_key in self.initialized_models:
+                if self.model_precisions.get(model_key) == precision:
+                    self.initialized_models.move_to_end(model_key)
+                    return True
+                # Requested precision differs from the loaded one - reload once it is idle
+                while self._model_refs.get(model_key):
+                    await self._wait_for_release()
+                self._unload_model(model_key)
             
+            if self.max_resident_models:
+                evicted = False
+                while len(self.initialized_models) >= self.max_resident_models:
+                    # Least recently used model that no request is generating with
+                    idle_key = next(
+                        (key for key in self.initialized_models if not self._model_refs.get(key)), None
+                    )
+                    if idle_key is None:
+                        await self._wait_for_release()
+                        continue
+                    self._unload_model(idle_key)
+                    evicted = True
+                if evicted:
+                    await asyncio.to_thread(self._release_memory)
+            
+            return await asyncio.to_thread(self._load_model, model_key, precision)
+
+    async def _wait_for_release(self):
+        """Wait until an in-flight generation unpins its model"""
+        self._model_released.clear()
+        await self._model_released.wait()
+
+    def _pin_model(self, model_key: str):
+        """Keep model_key loaded while a request generates with it"""
+        self._model_refs[model_key] = self._model_refs.get(model_key, 0) + 1
+
+    def _unpin_model(self, model_key: str):
+        self._model_refs[model_key] -= 1
+        self._model_released.set()
+
+    def _unload_model(self, model_key: str):
+        """Drop the service's references to a loaded model; callers make sure it isn't pinned"""
+        logger.info(f"Unloading {model_key} to free memory")
+        self.initialized_models.pop(model_key, None)
+        self.pipelines.pop(model_key, None)
+        self.models.pop(model_key, None)
+        self.translators.pop(model_key, None)
+
+    def _release_memory(self):
+        """Free memory held by unloaded models"""
+        gc.collect()
+        if self.device == "cuda":
+            import torch
+            torch.cuda.empty_cache()
+
+    def _load_model(self, model_key: str, precision: str) -> bool:
+        """Load tokenizer and model (or CTranslate2 translator) for model_key, blocking"""
         try:
+            from transformers import (
+                pipeline, AutoTokenizer, AutoModelForSeq2SeqLM, MBart50TokenizerFast, MBartForConditionalGeneration
+            )
+            
             config = self.model_configs[model_key]
             model_name = config['name']
             
@@ -84,54 +247,242 @@ class MalayalamSummarizationService:
             if model_key == 'mbart-large':
                 # Special handling for mBART
                 self.tokenizers[model_key] = MBart50TokenizerFast.from_pretrained(model_name)
-                self.models[model_key] = MBartForConditionalGeneration.from_pretrained(model_name)
             else:
-                # Standard handling for other models
                 self.tokenizers[model_key] = AutoTokenizer.from_pretrained(model_name)
-                self.models[model_key] = AutoModelForSeq2SeqLM.from_pretrained(model_name)
             
-            # Create pipeline
-            self.pipelines[model_key] = pipeline(
-                'summarization',
-                model=self.models[model_key],
-                tokenizer=self.tokenizers[model_key],
-                device=0 if self.device == "cuda" else -1
-            )
+            if self.use_ct2:
+                # CTranslate2 runs its own quantized kernels, compute_type replaces precision
+                self.translators[model_key] = self._export_backend(model_key)
+            elif model_key == 'mbart-large':
+                self.models[model_key] = self._load_pretrained(MBartForConditionalGeneration, model_name, precision)
+            else:
+                # Standard handling for other models
+                self.models[model_key] = self._load_pretrained(AutoModelForSeq2SeqLM, model_name, precision)
+            
+            if model_key in self.models:
+                model = self._apply_precision(self.models[model_key], precision).to(self.device).eval()
+                for param in model.parameters():
+                    param.requires_grad_(False)
+                if self.enable_compile:
+                    model = self._compile_model(model)
+                self.models[model_key] = model
+                
+                # Create pipeline
+                self.pipelines[model_key] = pipeline(
+                    'summarization',
+                    model=self.models[model_key],
+                    tokenizer=self.tokenizers[model_key],
+                    device=0 if self.device == "cuda" else -1
+                )
+            
+            self.initialized_models[model_key] = None
+            self.model_precisions[model_key] = precision
+            logger.info(f"✅ {model_name} initialized successfully ({precision})")
             
-            self.initialized_models.add(model_key)
-            logger.info(f"✅ {model_name} initialized successfully")
+            if self.device == "cuda":
+                self._warmup_model(model_key)
             return True
             
         except Exception as e:
             logger.error(f"❌ Failed to initialize {model_key}: {e}")
             return False
 
+    def _load_kwargs(self, precision: str) -> Dict[str, any]:
+        """from_pretrained arguments for loading weights straight from the checkpoint"""
+        # low_cpu_mem_usage builds the model on the meta device and fills it from the
+        # checkpoint, safetensors files are memory-mapped so workers share the page cache
+        return {
+            'torch_dtype': self._resolve_dtype(precision),
+            'low_cpu_mem_usage': True,
+        }
+
+    def _load_pretrained(self, model_cls, model_name: str, precision: str):
+        """from_pretrained with the fastest attention kernel the architecture supports"""
+        load_kwargs = self._load_kwargs(precision)
+        for attn_implementation in self._attn_implementations(load_kwargs['torch_dtype']):
+            try:
+                return model_cls.from_pretrained(model_name, attn_implementation=attn_implementation, **load_kwargs)
+            except (ValueError, ImportError, TypeError) as e:
+                # Architecture or installed transformers version doesn't support it
+                logger.info(f"{attn_implementation} attention unavailable for {model_name}: {e}")
+        
+        return model_cls.from_pretrained(model_name, **load_kwargs)
+
+    def _attn_implementations(self, dtype) -> List[str]:
+        """Fused attention kernels to try, fastest first"""
+        import torch
+        implementations = ['sdpa']
+        if self.device == "cuda" and FLASH_ATTN_AVAILABLE and dtype in (torch.float16, torch.bfloat16):
+            # FlashAttention-2 needs half precision weights
+            implementations.insert(0, 'flash_attention_2')
+        return implementations
+
+    def _export_backend(self, model_key: str):
+        """Load the CTranslate2 model for model_key, converting it from the HF checkpoint on first use"""
+        out_dir = os.path.join(self.ct2_model_dir, model_key)
+        if not os.path.isdir(out_dir):
+            logger.info(f"Exporting {model_key} to CTranslate2 ({self.ct2_compute_type})...")
+            converter = ctranslate2.converters.TransformersConverter(self.model_configs[model_key]['name'])
+            converter.convert(out_dir, quantization=self.ct2_compute_type)
+        
+        return ctranslate2.Translator(out_dir, device=self.device, compute_type=self.ct2_compute_type)
+
+    def _resolve_dtype(self, precision: str) -> 'torch.dtype':
+        """Pick the floating point dtype to load model weights in"""
+        import torch
+        if self.device != "cuda" or precision == 'fp32':
+            # CPU loads fp32; 'auto'/'int8' quantize the Linear layers afterwards
+            return torch.float32
+        if precision == 'fp16':
+            return torch.float16
+        if precision == 'bf16' or torch.cuda.get_device_capability()[0] >= 8:
+            # Ampere and newer have bf16 tensor cores without fp16's overflow risk
+            return torch.bfloat16
+        return torch.float16
+
+    def _apply_precision(self, model, precision: str):
+        """Quantize a loaded model for CPU inference when requested"""
+        import torch
+        if precision in ('int8', 'auto') and self.device == "cpu":
+            # Dynamic int8 quantization of the Linear layers halves weight bytes per decoder step
+            return torch.ao.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        
+        if precision == 'int8':
+            logger.warning("int8 dynamic quantization is CPU-only, using half precision on GPU")
+        
+        # GPU precisions are applied through torch_dtype at load time
+        return model
+
+    def _warmup_model(self, model_key: str):
+        """Run dummy generations so CUDA init, autotuning and graph capture happen before real requests"""
+        import torch
+        config = self.model_configs[model_key]
+        dummy = "ഇത് ഒരു പരീക്ഷണ വാചകം ആണ്. "
+        
+        try:
+            # A typical short input and one filling max_input_length, so both shape regimes are cached.
+            # One pass each is enough: this runs under the model lock and blocks other loads and requests.
+            # Every repetition of dummy is at least 4 tokens, so the long one is still truncated.
+            for text in (dummy * 20, dummy * (config['max_input_length'] // 4)):
+                if model_key == 'mbart-large':
+                    self._mbart_generate(
+                        [text], config['max_output_length'], config['min_output_length'], 'malayalam'
+                    )
+                else:
+                    self._generate_summary(
+                        model_key, text, config['max_output_length'], config['min_output_length']
+                    )
+            torch.cuda.synchronize()
+            torch.cuda.empty_cache()
+        except Exception as e:
+            logger.warning(f"Warmup failed for {model_key}: {e}")
+
+    def _compile_model(self, model):
+        """Compile the forward pass generate() calls per decoding step, eager on failure"""
+        import torch
+        try:
+            model.forward = torch.compile(model.forward, mode='reduce-overhead', fullgraph=False)
+        except Exception as e:
+            logger.warning(f"Model compilation failed, using eager mode: {e}")
+        return model
+
+    def _generate_summary(
+        self, model_key: str, text: str, max_length: int, min_length: int, num_beams: int = None
+    ) -> str:
+        """Run a single summarization pass with the backend loaded for model_key"""
+        return self._generate_summaries(model_key, [text], max_length, min_length, num_beams)[0]
+
+    def _generate_summaries(
+        self, model_key: str, texts: List[str], max_length: int, min_length: int, num_beams: int = None
+    ) -> List[str]:
+        """Summarize several texts with batched calls to the backend loaded for model_key"""
+        import torch
+        num_beams = num_beams or self.num_beams
+        order, sorted_texts = self._sort_by_length(texts)
+        
+        if model_key in self.translators:
+            tokenizer = self.tokenizers[model_key]
+            max_input_length = self.model_configs[model_key]['max_input_length']
+            results = self.translators[model_key].translate_batch(
+                [
+                    tokenizer.convert_ids_to_tokens(
+                        tokenizer.encode(text, truncation=True, max_length=max_input_length)
+                    )
+                    for text in sorted_texts
+                ],
+                max_batch_size=self.max_batch_size,
+                max_decoding_length=max_length,
+                min_decoding_length=min_length,
+                beam_size=num_beams,
+                no_repeat_ngram_size=2
+            )
+            summaries = [
+                tokenizer.decode(tokenizer.convert_tokens_to_ids(result.hypotheses[0]), skip_special_tokens=True)
+                for result in results
+            ]
+        else:
+            with torch.inference_mode():
+                results = self.pipelines[model_key](
+                    sorted_texts,
+                    batch_size=min(len(sorted_texts), self.max_batch_size),
+                    max_length=max_length,
+                    min_length=min_length,
+                    num_beams=num_beams,
+                    early_stopping=num_beams > 1,
+                    do_sample=False,
+                    truncation=True
+                )
+            summaries = [result['summary_text'] for result in results]
+        
+        return self._restore_order(order, summaries)
+
+    @staticmethod
+    def _sort_by_length(texts: List[str]):
+        """Order texts by length so padded batches hold inputs of similar size"""
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        return order, [texts[i] for i in order]
+
+    @staticmethod
+    def _restore_order(order: List[int], sorted_results: List[str]) -> List[str]:
+        """Undo _sort_by_length on a list of per-text results"""
+        results = [None] * len(order)
+        for position, index in enumerate(order):
+            results[index] = sorted_results[position]
+        return results
+
     def preprocess_malayalam_text(self, text: str) -> str:
         """Preprocess Malayalam text for better summarization"""
         if not text:
             return ""
         
-        # Remove excessive whitespace and newlines
-        text = re.sub(r'\n+', ' ', text)
-        text = re.sub(r'\s+', ' ', text)
+        # Remove excessive whitespace and newlines (\s covers \n, one pass is enough)
+        text = self._re_ws.sub(' ', text)
         
         # Handle Malayalam-English mixed content
         # Preserve Malayalam script while cleaning English parts
-        text = re.sub(r'([a-zA-Z]+)(\u0D00-\u0D7F)', r'\1 \2', text)  # Add space between English and Malayalam
+        text = self._re_en_ml.sub(r'\1 \2', text)  # Add space between English and Malayalam
         
         # Remove email headers in English
-        text = re.sub(r'From:.*?Subject:', 'വിഷയം:', text, flags=re.DOTALL)
-        text = re.sub(r'--.*?(?:\n|$)', '', text)
+        text = self._re_hdr.sub('വിഷയം:', text)
+        text = self._re_dash.sub('', text)
         
         # Clean up punctuation
-        text = re.sub(r'([.!?।])\s*([.!?।])', r'\1', text)
+        text = self._re_punct.sub(r'\1', text)
         
         return text.strip()
 
-    def chunk_malayalam_text(self, text: str, max_length: int = 800) -> List[str]:
-        """Split Malayalam text into manageable chunks"""
+    def chunk_malayalam_text(self, text: str, max_length: int = 800, tokenizer=None) -> List[str]:
+        """
+        Split Malayalam text into manageable chunks
+        With a fast tokenizer max_length counts tokens, otherwise characters
+        """
+        if tokenizer is not None and getattr(tokenizer, 'is_fast', False):
+            return self._chunk_by_tokens(text, max_length, tokenizer)
+        
         # Split by Malayalam sentence endings
-        sentences = re.split(self.malayalam_patterns['sentence_endings'], text)
+        sentences = self._re_sentence_end.split(text)
         chunks = []
         current_chunk = ""
         
@@ -152,6 +503,33 @@ class MalayalamSummarizationService:
             
         return chunks
 
+    def _chunk_by_tokens(self, text: str, max_tokens: int, tokenizer) -> List[str]:
+        """Split text into windows of at most max_tokens tokens, ending on a sentence boundary where possible"""
+        # One tokenizer pass; offsets map every token back to its span in text
+        offsets = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)['offset_mapping']
+        token_starts = [start for start, _ in offsets]
+        sentence_ends = [match.end() for match in self._re_sentence_end.finditer(text)]
+        
+        chunks = []
+        start = 0
+        while start < len(offsets):
+            stop = min(start + max_tokens, len(offsets))
+            if stop < len(offsets):
+                # Last sentence ending inside the window, the next chunk starts at the token after it
+                boundary = bisect.bisect_right(sentence_ends, offsets[stop - 1][1]) - 1
+                if boundary >= 0:
+                    sentence_stop = bisect.bisect_left(token_starts, sentence_ends[boundary], lo=start, hi=stop)
+                    if sentence_stop > start:
+                        stop = sentence_stop
+            
+            char_end = token_starts[stop] if stop < len(offsets) else len(text)
+            chunk = text[token_starts[start]:char_end].strip()
+            if chunk:
+                chunks.append(chunk)
+            start = stop
+        
+        return chunks
+
     async def summarize_with_model(
         self, 
         text: str, 
@@ -159,134 +537,177 @@ class MalayalamSummarizationService:
         max_length: int = None,
         min_length: int = None,
         language_hint: str = 'malayalam',
-        role_context: str = None
+        role_context: str = None,
+        precision: str = None,
+        num_beams: int = None
     ) -> Dict[str, any]:
         """Summarize Malayalam/multilingual text using specified model"""
         
         model_key = model_key or self.default_model
+        num_beams = num_beams or self.num_beams
         
         # Ensure model is initialized
-        if not await self.initialize_model(model_key):
+        if not await self.initialize_model(model_key, precision):
             raise Exception(f"Failed to initialize model: {model_key}")
         
-        config = self.model_configs[model_key]
-        max_length = max_length or config['max_output_length']
-        min_length = min_length or config['min_output_length']
-        
-        # Preprocess text
-        processed_text = self.preprocess_malayalam_text(text)
-        
-        if len(processed_text) < 30:
-            return {
-                'summary': processed_text,
-                'model_used': model_key,
-                'confidence': 0.5,
-                'method': 'passthrough',
-                'language': language_hint
-            }
-        
+        # Pinned until generation finishes, so LRU eviction can't unload it mid-request
+        self._pin_model(model_key)
         try:
-            # Handle long texts by chunking
-            chunks = self.chunk_malayalam_text(processed_text, config['max_input_length'] - 100)
+            config = self.model_configs[model_key]
+            max_length = max_length or config['max_output_length']
+            min_length = min_length or config['min_output_length']
             
-            if len(chunks) == 1:
-                # Single chunk processing
-                if model_key == 'mbart-large':
-                    # Special handling for mBART with language codes
-                    summary = await self._summarize_with_mbart(processed_text, max_length, min_length, language_hint)
-                else:
-                    result = self.pipelines[model_key](
-                        processed_text,
-                        max_length=max_length,
-                        min_length=min_length,
-                        do_sample=False,
-                        truncation=True
-                    )
-                    summary = result[0]['summary_text']
-                    
-            else:
-                # Multi-chunk processing
-                chunk_summaries = []
-                for chunk in chunks:
+            # Preprocess text
+            processed_text = self.preprocess_malayalam_text(text)
+            
+            cache_key = self._summary_cache_key(
+                model_key, self.model_precisions.get(model_key), max_length, min_length, num_beams,
+                language_hint, role_context, processed_text
+            )
+            cached = self._summary_cache.get(cache_key)
+            if cached is not None:
+                return dict(cached, original_length=len(text))
+            
+            if len(processed_text) < 30:
+                return {
+                    'summary': processed_text,
+                    'model_used': model_key,
+                    'confidence': 0.5,
+                    'method': 'passthrough',
+                    'language': language_hint
+                }
+            
+            try:
+                # Handle long texts by chunking
+                # Chunks are sized in tokens so each one fits the model input without truncation
+                tokenizer = self.tokenizers[model_key]
+                chunks = self.chunk_malayalam_text(
+                    processed_text,
+                    config['max_input_length'] - tokenizer.num_special_tokens_to_add(),
+                    tokenizer
+                )
+            
+                if len(chunks) == 1:
+                    # Single chunk processing
                     if model_key == 'mbart-large':
-                        chunk_summary = await self._summarize_with_mbart(
-                            chunk, 
-                            max_length // len(chunks) + 20, 
-                            max(10, min_length // len(chunks)),
-                            language_hint
+                        # Special handling for mBART with language codes
+                        summary = await self._summarize_with_mbart(
+                            processed_text, max_length, min_length, language_hint, num_beams
                         )
                     else:
-                        result = self.pipelines[model_key](
-                            chunk,
-                            max_length=max_length // len(chunks) + 20,
-                            min_length=max(10, min_length // len(chunks)),
-                            do_sample=False,
-                            truncation=True
+                        summary = await asyncio.to_thread(
+                            self._generate_summary, model_key, processed_text, max_length, min_length, num_beams
                         )
-                        chunk_summary = result[0]['summary_text']
                     
-                    chunk_summaries.append(chunk_summary)
-                
-                # Combine chunk summaries
-                combined_text = " ".join(chunk_summaries)
-                
-                # Final summarization if needed
-                if len(combined_text) > config['max_input_length']:
+                else:
+                    # Multi-chunk processing, all chunks go through the model as batches
+                    chunk_max_length = max_length // len(chunks) + 20
+                    chunk_min_length = max(10, min_length // len(chunks))
                     if model_key == 'mbart-large':
-                        summary = await self._summarize_with_mbart(combined_text, max_length, min_length, language_hint)
+                        chunk_summaries = await asyncio.to_thread(
+                            self._mbart_generate, chunks, chunk_max_length, chunk_min_length, language_hint, num_beams
+                        )
                     else:
-                        result = self.pipelines[model_key](
-                            combined_text,
-                            max_length=max_length,
-                            min_length=min_length,
-                            do_sample=False,
-                            truncation=True
+                        chunk_summaries = await asyncio.to_thread(
+                            self._generate_summaries, model_key, chunks, chunk_max_length, chunk_min_length,
+                            num_beams
                         )
-                        summary = result[0]['summary_text']
-                else:
-                    summary = combined_text
+                
+                    # Combine chunk summaries
+                    combined_text = " ".join(chunk_summaries)
+                
+                    # Final summarization if needed
+                    if len(combined_text) > config['max_input_length']:
+                        if model_key == 'mbart-large':
+                            summary = await self._summarize_with_mbart(
+                                combined_text, max_length, min_length, language_hint, num_beams
+                            )
+                        else:
+                            summary = await asyncio.to_thread(
+                                self._generate_summary, model_key, combined_text, max_length, min_length, num_beams
+                            )
+                    else:
+                        summary = combined_text
             
-            # Post-process summary for role context
-            if role_context:
-                summary = self.adapt_malayalam_summary_for_role(summary, role_context)
+                # Post-process summary for role context
+                if role_context:
+                    summary = self.adapt_malayalam_summary_for_role(summary, role_context)
             
-            return {
-                'summary': summary.strip(),
-                'model_used': model_key,
-                'confidence': 0.80,  # Slightly lower confidence for multilingual
-                'method': 'multi-chunk' if len(chunks) > 1 else 'single-chunk',
-                'chunks_processed': len(chunks),
-                'language': language_hint,
-                'original_length': len(text),
-                'summary_length': len(summary)
-            }
+                result = {
+                    'summary': summary.strip(),
+                    'model_used': model_key,
+                    'confidence': 0.80,  # Slightly lower confidence for multilingual
+                    'method': 'multi-chunk' if len(chunks) > 1 else 'single-chunk',
+                    'chunks_processed': len(chunks),
+                    'backend': 'ctranslate2' if model_key in self.translators else 'transformers',
+                    'language': language_hint,
+                    'original_length': len(text),
+                    'summary_length': len(summary)
+                }
+                self._summary_cache[cache_key] = result
+                return dict(result)
             
-        except Exception as e:
-            logger.error(f"Malayalam summarization failed with {model_key}: {e}")
+            except Exception as e:
+                logger.error(f"Malayalam summarization failed with {model_key}: {e}")
             
-            # Fallback to simple truncation with Malayalam awareness
-            words = processed_text.split()
-            fallback_summary = " ".join(words[:30]) + "..." if len(words) > 30 else processed_text
+                # Fallback to simple truncation with Malayalam awareness
+                words = processed_text.split()
+                fallback_summary = " ".join(words[:30]) + "..." if len(words) > 30 else processed_text
             
-            return {
-                'summary': fallback_summary,
-                'model_used': 'fallback',
-                'confidence': 0.3,
-                'method': 'truncation',
-                'language': language_hint,
-                'error': str(e)
-            }
+                return {
+                    'summary': fallback_summary,
+                    'model_used': 'fallback',
+                    'confidence': 0.3,
+                    'method': 'truncation',
+                    'language': language_hint,
+                    'error': str(e)
+                }
+        finally:
+            self._unpin_model(model_key)
+
+    @staticmethod
+    def _summary_cache_key(*parts) -> bytes:
+        """Digest of the generation inputs; identity only, so a fast non-cryptographic hash will do"""
+        data = '|'.join(str(part) for part in parts).encode('utf-8', errors='surrogatepass')
+        if XXHASH_AVAILABLE:
+            return xxhash.xxh3_128_digest(data)
+        return hashlib.blake2b(data, digest_size=16).digest()
 
     async def _summarize_with_mbart(
         self, 
         text: str, 
         max_length: int, 
         min_length: int, 
-        language_hint: str
+        language_hint: str,
+        num_beams: int = None
     ) -> str:
         """Special handling for mBART model with language codes"""
+        summaries = await asyncio.to_thread(
+            self._mbart_generate, [text], max_length, min_length, language_hint, num_beams
+        )
+        return summaries[0]
+
+    def _mbart_generate(
+        self,
+        texts: List[str],
+        max_length: int,
+        min_length: int,
+        language_hint: str,
+        num_beams: int = None
+    ) -> List[str]:
+        """Summarize several texts with mBART in batched generate calls"""
+        import torch
         tokenizer = self.tokenizers['mbart-large']
-        model = self.models['mbart-large']
+        num_beams = num_beams or self.num_beams
+        
+        # Identical chunks (repeated boilerplate sections) are encoded and decoded only once
+        unique_texts = list(dict.fromkeys(texts))
+        if len(unique_texts) < len(texts):
+            summaries = dict(zip(
+                unique_texts,
+                self._mbart_generate(unique_texts, max_length, min_length, language_hint, num_beams)
+            ))
+            return [summaries[text] for text in texts]
         
         # Set language codes for mBART
         if language_hint == 'malayalam':
@@ -296,23 +717,103 @@ class MalayalamSummarizationService:
             src_lang = 'en_XX'
             tgt_lang = 'en_XX'
         
-        # Tokenize with language code
-        tokenizer.src_lang = src_lang
-        inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=1024)
-        
-        # Generate summary
-        summary_ids = model.generate(
-            inputs["input_ids"],
-            max_length=max_length,
-            min_length=min_length,
-            forced_bos_token_id=tokenizer.lang_code_to_id[tgt_lang],
-            no_repeat_ngram_size=2,
-            num_beams=4,
-            early_stopping=True
-        )
+        order, sorted_texts = self._sort_by_length(texts)
         
-        summary = tokenizer.decode(summary_ids[0], skip_special_tokens=True)
-        return summary
+        if 'mbart-large' in self.translators:
+            # Source tokens carry the src_lang code; the target prefix replaces forced_bos_token_id
+            with self._mbart_tokenizer_lock:
+                tokenizer.src_lang = src_lang
+                source_tokens = [
+                    tokenizer.convert_ids_to_tokens(tokenizer.encode(text, truncation=True, max_length=1024))
+                    for text in sorted_texts
+                ]
+            results = self.translators['mbart-large'].translate_batch(
+                source_tokens,
+                target_prefix=[[tgt_lang]] * len(sorted_texts),
+                max_batch_size=self.max_batch_size,
+                max_decoding_length=max_length,
+                min_decoding_length=min_length,
+                beam_size=num_beams,
+                no_repeat_ngram_size=2
+            )
+            summaries = [
+                tokenizer.decode(tokenizer.convert_tokens_to_ids(result.hypotheses[0]), skip_special_tokens=True)
+                for result in results
+            ]
+            return self._restore_order(order, summaries)
+        
+        model = self.models['mbart-large']
+        
+        generate_kwargs = {'use_cache': True}
+        if self.enable_compile and getattr(model, '_supports_static_cache', False):
+            # Static K/V cache keeps decoder shapes constant so each step replays a CUDA graph
+            generate_kwargs['cache_implementation'] = 'static'
+        
+        # Tokenize with language code; compiled models get fixed-size inputs so graphs are reused
+        with self._mbart_tokenizer_lock:
+            tokenizer.src_lang = src_lang
+            batches = [
+                tokenizer(
+                    sorted_texts[start:start + self.max_batch_size],
+                    return_tensors="pt",
+                    truncation=True,
+                    max_length=1024,
+                    padding='max_length' if self.enable_compile else True
+                )
+                for start in range(0, len(sorted_texts), self.max_batch_size)
+            ]
+        
+        use_streams = self.device == "cuda" and len(batches) > 1
+        if use_streams:
+            # Double-buffer host->device copies: batch i+1 is copied from pinned memory on a
+            # side stream while batch i is generated on the default stream
+            copy_stream = torch.cuda.Stream()
+            
+            def prefetch(batch):
+                with torch.cuda.stream(copy_stream):
+                    return {
+                        name: tensor.pin_memory().to(self.device, non_blocking=True)
+                        for name, tensor in batch.items()
+                    }
+            
+            next_inputs = prefetch(batches[0])
+        
+        summaries = []
+        for index, batch in enumerate(batches):
+            if use_streams:
+                compute_stream = torch.cuda.current_stream()
+                compute_stream.wait_stream(copy_stream)
+                inputs = next_inputs
+                for tensor in inputs.values():
+                    # Tensors were allocated on the copy stream, keep them alive for the compute stream
+                    tensor.record_stream(compute_stream)
+                if index + 1 < len(batches):
+                    next_inputs = prefetch(batches[index + 1])
+            else:
+                inputs = batch.to(self.device)
+            
+            # Generate summaries
+            with torch.inference_mode():
+                # Encode once up front; generate() reuses the encoder states and the decoder K/V cache
+                encoder_outputs = model.get_encoder()(
+                    input_ids=inputs["input_ids"],
+                    attention_mask=inputs["attention_mask"]
+                )
+                summary_ids = model.generate(
+                    encoder_outputs=encoder_outputs,
+                    attention_mask=inputs["attention_mask"],
+                    max_length=max_length,
+                    min_length=min_length,
+                    forced_bos_token_id=tokenizer.lang_code_to_id[tgt_lang],
+                    no_repeat_ngram_size=2,
+                    num_beams=num_beams,
+                    early_stopping=num_beams > 1,
+                    **generate_kwargs
+                )
+            
+            summaries.extend(tokenizer.batch_decode(summary_ids, skip_special_tokens=True))
+        
+        return self._restore_order(order, summaries)
 
     def adapt_malayalam_summary_for_role(self, summary: str, role: str) -> str:
         """Adapt Malayalam summary based on user role"""
@@ -338,36 +839,43 @@ class MalayalamSummarizationService:
         models = models or ['indicbart', 'mt5-small']
         role_contexts = role_contexts or ['staff', 'manager', 'director']
         
-        results = {}
+        # Every work item shares the same input text, so each model needs exactly one
+        # generation; role variants only differ by their prefix and reuse the default model's run
+        run_models = list(dict.fromkeys(list(models) + [self.default_model]))
+        outcomes = await asyncio.gather(
+            *(
+                self.summarize_with_model(text, model, language_hint=language_hint, num_beams=1)
+                for model in run_models
+            ),
+            return_exceptions=True
+        )
         
-        # Generate model-based summaries
-        for model in models:
-            try:
-                result = await self.summarize_with_model(text, model, language_hint=language_hint)
-                results[f'model_{model}'] = result
-            except Exception as e:
-                logger.error(f"Failed to generate Malayalam summary with {model}: {e}")
+        summaries = {}
+        for model, outcome in zip(run_models, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Failed to generate Malayalam summary with {model}: {outcome}")
+            else:
+                summaries[model] = outcome
+        
+        results = {f'model_{model}': summaries[model] for model in models if model in summaries}
+        
+        base = summaries.get(self.default_model)
+        if base is None:
+            return results
         
-        # Generate role-specific summaries
         for role in role_contexts:
-            try:
-                result = await self.summarize_with_model(
-                    text, 
-                    self.default_model,
-                    language_hint=language_hint,
-                    role_context=role
-                )
-                results[f'role_{role}'] = result
-            except Exception as e:
-                logger.error(f"Failed to generate {role} summary in Malayalam: {e}")
+            result = dict(base)
+            if base.get('method') not in ('passthrough', 'truncation'):
+                result['summary'] = self.adapt_malayalam_summary_for_role(base['summary'], role)
+                result['summary_length'] = len(result['summary'])
+            results[f'role_{role}'] = result
         
         return results
 
     def detect_malayalam_content_ratio(self, text: str) -> float:
         """Detect ratio of Malayalam content in text"""
-        malayalam_chars = sum(1 for char in text if '\u0D00' <= char <= '\u0D7F')
-        total_chars = len([c for c in text if c.isalpha()])
-        return malayalam_chars / total_chars if total_chars > 0 else 0.0
+        # Same statistic as the language detector, which counts code points with NumPy
+        return get_language_detector().get_malayalam_ratio(text)
 
     def get_model_info(self) -> Dict[str, any]:
         """Get information about available Malayalam models"""
@@ -376,6 +884,8 @@ class MalayalamSummarizationService:
             'initialized_models': list(self.initialized_models),
             'default_model': self.default_model,
             'device': self.device,
+            'backend': 'ctranslate2' if self.use_ct2 else 'transformers',
+            'model_precisions': self.model_precisions,
             'supported_languages': ['malayalam', 'english', 'multilingual'],
             'model_details': self.model_configs
         }
@@ -405,9 +915,6 @@ class MalayalamSummarizationService:
                 'device': self.device
             }
 
-# Global service instance
-malayalam_summarizer = MalayalamSummarizationService()
-
 async def summarize_malayalam_text(
     text: str, 
     model: str = None,
@@ -416,7 +923,7 @@ async def summarize_malayalam_text(
     **kwargs
 ) -> Dict[str, any]:
     """Convenience function for Malayalam summarization"""
-    return await malayalam_summarizer.summarize_with_model(
+    return await get_malayalam_summarizer().summarize_with_model(
         text, 
         model, 
         language_hint=language_hint,
@@ -424,6 +931,7 @@ async def summarize_malayalam_text(
         **kwargs
     )
 
+@functools.lru_cache(maxsize=1)
 def get_malayalam_summarizer() -> MalayalamSummarizationService:
-    """Get the Malayalam summarization service instance"""
-    return malayalam_summarizer
+    """Get the Malayalam summarization service instance (created on first call)"""
+    return MalayalamSummarizationService()
@@ -1,6 +1,8 @@
 """
 Authentication utilities
 """
+import threading
+from cachetools import TTLCache
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer
 from sqlalchemy.orm import Session
@@ -10,8 +12,18 @@ from app.utils.jwt import verify_token
 
 security = HTTPBearer()
 
+# Authenticated users by raw bearer token; the short TTL bounds how long a deleted
+# user or expired token keeps working
+_user_cache = TTLCache(maxsize=4096, ttl=60)
+_user_cache_lock = threading.Lock()  # sync dependencies run in FastAPI's thread pool
+
 def get_current_user(token: str = Depends(security), db: Session = Depends(get_db)):
     """Get current authenticated user"""
+    with _user_cache_lock:
+        cached_user = _user_cache.get(token.credentials)
+    if cached_user is not None:
+        return dict(cached_user)
+    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -33,12 +45,15 @@ def get_current_user(token: str = Depends(security), db: Session = Depends(get_d
     if user is None:
         raise credentials_exception
     
-    return {
+    current_user = {
         "id": user.id,
         "email": user.email,
         "name": user.name,
         "is_admin": user.is_admin
     }
+    with _user_cache_lock:
+        _user_cache[token.credentials] = current_user
+    return dict(current_user)
 
 def require_admin(current_user = Depends(get_current_user)):
     """Require admin privileges"""
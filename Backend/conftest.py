@@ -0,0 +1,34 @@
+"""
+Shared pytest fixtures
+"""
+import httpx
+import pytest
+from app.main_production_clean import app
+from fastapi.testclient import TestClient
+
+# Standalone debug/deployment scripts that match test_*.py but hold no tests;
+# importing them during collection only builds extra apps
+collect_ignore = ["test_server.py", "test_deployment.py"]
+
+
+@pytest.fixture(scope='session')
+def anyio_backend():
+    # Async tests run on asyncio only
+    return 'asyncio'
+
+
+@pytest.fixture(scope='session')
+def client():
+    # One client per test session (per worker under pytest-xdist); the with block
+    # runs app startup/shutdown once and keeps a single asyncio portal open
+    with TestClient(app, backend='asyncio') as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope='session')
+async def async_client():
+    # One AsyncClient and ASGI transport for the session, kept open between requests
+    # (ASGITransport speaks HTTP/1.1 only)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://testserver', http2=False) as test_client:
+        yield test_client
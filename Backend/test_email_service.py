@@ -0,0 +1,127 @@
+"""
+Test IMAP BODYSTRUCTURE parsing and selective body fetching in the email service
+"""
+import base64
+import quopri
+
+import pytest
+
+# The email service imports the database and settings stack
+pytest.importorskip('sqlalchemy')
+pytest.importorskip('pydantic_settings')
+
+from app.services.email_service import EmailService, _parse_bodystructure, _walk_bodystructure
+
+
+HEADER = (b'Subject: Maintenance report\r\nFrom: ops@kmrl.co.in\r\nTo: docs@kmrl.co.in\r\n'
+          b'Message-ID: <1@kmrl.co.in>\r\nContent-Type: multipart/mixed; boundary="y"\r\n\r\n')
+
+SINGLE_PART = (b'1 (RFC822.SIZE 320 BODYSTRUCTURE ("TEXT" "PLAIN" ("CHARSET" "UTF-8") NIL NIL "7BIT" 42 3 '
+               b'NIL NIL NIL NIL) BODY[HEADER] {120}')
+
+# multipart/mixed( multipart/alternative(text/plain QP, text/html base64), application/pdf attachment )
+NESTED = (b'1 (RFC822.SIZE 9999 BODYSTRUCTURE ((("TEXT" "PLAIN" ("CHARSET" "UTF-8") NIL NIL "QUOTED-PRINTABLE" '
+          b'20 2 NIL NIL NIL NIL)("TEXT" "HTML" ("CHARSET" "UTF-8") NIL NIL "BASE64" 40 1 NIL NIL NIL NIL) '
+          b'"ALTERNATIVE" ("BOUNDARY" "x") NIL NIL NIL)("APPLICATION" "PDF" ("NAME" "inv.pdf") NIL NIL "BASE64" '
+          b'4000 NIL ("ATTACHMENT" ("FILENAME" "invoice.pdf")) NIL NIL) "MIXED" ("BOUNDARY" "y") NIL NIL NIL) '
+          b'BODY[HEADER] {120}')
+
+# A literal inside BODYSTRUCTURE can't be parsed from the FETCH line alone
+LITERAL = (b'1 (RFC822.SIZE 500 BODYSTRUCTURE ("TEXT" "PLAIN" ("NAME" {9}')
+
+RAW_MESSAGE = (b'Subject: Fallback\r\nFrom: ops@kmrl.co.in\r\nContent-Type: text/plain\r\n\r\n'
+               b'Full message body')
+
+
+class FakeIMAP:
+    """Answers FETCH commands from canned responses and records them"""
+
+    def __init__(self, structure: bytes, sections=None):
+        self.structure = structure
+        self.sections = sections or {}
+        self.fetches = []
+
+    def select(self, folder):
+        return 'OK', [b'1']
+
+    def search(self, charset, criteria):
+        return 'OK', [b'1']
+
+    def fetch(self, email_id, query):
+        self.fetches.append(query)
+        if 'BODYSTRUCTURE' in query:
+            return 'OK', [(self.structure, HEADER), b')']
+        if query == '(RFC822)':
+            return 'OK', [(b'1 (RFC822 {%d}' % len(RAW_MESSAGE), RAW_MESSAGE), b')']
+        return 'OK', [
+            (b'1 (BODY[%s] {%d}' % (section.encode(), len(payload)), payload)
+            for section, payload in self.sections.items()
+        ] + [b')']
+
+    def close(self):
+        pass
+
+    def logout(self):
+        pass
+
+
+@pytest.fixture
+def service(monkeypatch):
+    def connect(mail):
+        monkeypatch.setattr(EmailService, 'connect_imap', lambda self: mail)
+        return EmailService()
+    return connect
+
+
+def test_single_part_structure():
+    parts = list(_walk_bodystructure(_parse_bodystructure(SINGLE_PART)))
+
+    assert parts == [('1', {
+        'content_type': 'text/plain',
+        'encoding': '7bit',
+        'size': 42,
+        'disposition': None,
+        'filename': None
+    })]
+
+
+def test_nested_multipart_with_attachment():
+    parts = dict(_walk_bodystructure(_parse_bodystructure(NESTED)))
+
+    assert list(parts) == ['1.1', '1.2', '2']
+    assert parts['1.1']['content_type'] == 'text/plain'
+    assert parts['1.1']['encoding'] == 'quoted-printable'
+    assert parts['1.2']['content_type'] == 'text/html'
+    assert parts['2']['disposition'] == 'attachment'
+    assert parts['2']['filename'] == 'invoice.pdf'
+    # Encoded base64 octets are reported as decoded size
+    assert parts['2']['size'] == 3000
+
+
+def test_literal_falls_back_to_full_message(service):
+    assert _parse_bodystructure(LITERAL) is None
+
+    mail = FakeIMAP(LITERAL)
+    emails = service(mail).fetch_recent_emails()
+
+    assert mail.fetches[-1] == '(RFC822)'
+    assert emails[0]['subject'] == 'Fallback'
+    assert emails[0]['body'] == 'Full message body'
+
+
+def test_text_sections_are_decoded_and_attachments_skipped(service):
+    mail = FakeIMAP(NESTED, sections={
+        '1.1': quopri.encodestring('Track work on ലൈൻ 1'.encode('utf-8')),
+        '1.2': base64.b64encode(b'<p>Signal <b>upgrade</b></p>'),
+    })
+    emails = service(mail).fetch_recent_emails()
+
+    # Only the two inline text sections are downloaded, never the PDF
+    assert mail.fetches[-1] == '(BODY.PEEK[1.1] BODY.PEEK[1.2])'
+    email_data = emails[0]
+    assert email_data['subject'] == 'Maintenance report'
+    assert email_data['body'] == 'Track work on ലൈൻ 1Signal upgrade'
+    assert email_data['attachments'] == [
+        {'filename': 'invoice.pdf', 'content_type': 'application/pdf', 'size': 3000}
+    ]
+    assert email_data['size'] == 9999
@@ -0,0 +1,38 @@
+"""
+Test language detection on single-script documents
+"""
+import pytest
+from app.services.language_detection_service import LanguageDetectionService
+
+pytest.importorskip('langdetect')
+
+ENGLISH_TEXT = 'Please find attached the invoice for the maintenance contract for the month of October.'
+MALAYALAM_TEXT = 'കൊച്ചി മെട്രോ റെയിൽ ലിമിറ്റഡ് പുതിയ സർവീസുകൾ പ്രഖ്യാപിച്ചു'
+
+
+def _langdetect_combination(detector, text):
+    """Script analysis blended with a langdetect run, as every document was scored before the single-script shortcut"""
+    script_result = detector.detect_with_script_analysis(text)
+    langdetect_result = detector.detect_with_langdetect(text)
+
+    english_prob = script_result['english'] * 0.7 + langdetect_result['english'] * 0.3
+    malayalam_prob = script_result['malayalam'] * 0.8 + langdetect_result['malayalam'] * 0.2
+    total_prob = english_prob + malayalam_prob
+    if total_prob > 1.0:
+        english_prob /= total_prob
+        malayalam_prob /= total_prob
+    return english_prob, malayalam_prob
+
+
+@pytest.mark.parametrize('text,primary_language', [
+    (ENGLISH_TEXT, 'english'),
+    (MALAYALAM_TEXT, 'malayalam'),
+], ids=['english', 'malayalam'])
+def test_single_script_matches_langdetect_combination(text, primary_language):
+    detector = LanguageDetectionService()
+    english_prob, malayalam_prob = _langdetect_combination(detector, text)
+
+    result = detector.detect_language(text)
+    assert result['primary_language'] == primary_language
+    assert result['probabilities']['english'] == pytest.approx(english_prob, abs=0.01)
+    assert result['probabilities']['malayalam'] == pytest.approx(malayalam_prob, abs=0.01)